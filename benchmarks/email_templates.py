@@ -0,0 +1,73 @@
+"""
+Email template rendering micro-benchmark
+
+Run from the repository root:
+
+    python benchmarks/email_templates.py
+
+Times 10k renders of the welcome (HTML and text parts) and reminder
+templates through the shared, precompiled environment, and the cost of
+compiling each template from source for comparison.
+"""
+
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.email_service import email_service
+from src.utils.email_templates import EmailTemplates, email_templates
+
+RENDERS = 10_000
+
+WELCOME_CONTEXT = {
+    'employee_name': 'Jordan <Lee>',
+    'employee_email': 'jordan.lee@example.com',
+    'company_name': 'Acme & Co',
+    'login_url': 'https://training.example.com/login',
+    'temp_password': 'Xk29fLmQ7pRt',
+    'year': datetime.now().year
+}
+
+OVERDUE_MODULES = [
+    {'title': 'Phishing Awareness', 'due_date': '2026-09-01'},
+    {'title': 'Password Security', 'due_date': '2026-09-15'},
+    {'title': 'Social Engineering', 'due_date': '2026-10-01'},
+]
+
+
+def timed(fn, count):
+    """Total wall-clock milliseconds for count calls of fn"""
+    start = time.perf_counter()
+    for _ in range(count):
+        fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def report(name, total_ms, count):
+    print(f"{name:<28} {total_ms:>10.1f} ms {total_ms * 1000 / count:>8.1f} us/render")
+
+
+def main():
+    render_reminder = email_service.compile_reminder_email()
+
+    print(f"{RENDERS} renders, precompiled templates")
+    report('welcome.html + welcome.txt', timed(lambda: (
+        email_templates.render('welcome.html', **WELCOME_CONTEXT),
+        email_templates.render('welcome.txt', **WELCOME_CONTEXT)
+    ), RENDERS), RENDERS)
+    report('reminder.html', timed(lambda: render_reminder('Jordan <Lee>', OVERDUE_MODULES), RENDERS), RENDERS)
+
+    # A fresh environment per render shows what the template cache saves
+    compiles = 100
+    print(f"\n{compiles} renders, compiling from source each time")
+    report('welcome.html', timed(lambda: EmailTemplates().render('welcome.html', **WELCOME_CONTEXT), compiles), compiles)
+    report('reminder.html', timed(lambda: EmailTemplates().render(
+        'reminder.html', employee_name='Jordan <Lee>', overdue_modules=OVERDUE_MODULES
+    ), compiles), compiles)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""
+Serial vs process-pool batch password hashing
+
+Run from the repository root:
+
+    python benchmarks/hash_passwords.py
+
+PASSWORD_HASH_WORKERS sets the pool size as in production. The pool is
+started before timing, so the pooled numbers exclude worker startup.
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils import security
+from src.utils.security import PasswordSecurity
+
+SIZES = (1_000, 10_000)
+REPEATS = 5
+
+
+def best_of(fn, repeats=REPEATS):
+    """Fastest wall-clock time of several runs, in milliseconds"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+
+def hash_batch(passwords, pool_threshold):
+    security.PASSWORD_HASH_POOL_THRESHOLD = pool_threshold
+    return PasswordSecurity.hash_passwords(passwords)
+
+
+def main():
+    # Start the workers outside the timed runs
+    hash_batch(['warmup'] * security.PASSWORD_HASH_WORKERS, 1)
+
+    print(f"workers={security.PASSWORD_HASH_WORKERS} best of {REPEATS}")
+    print(f"{'passwords':>10} {'serial ms':>10} {'pooled ms':>10} {'speedup':>8}")
+    for size in SIZES:
+        passwords = [PasswordSecurity.generate_secure_password() for _ in range(size)]
+        serial = best_of(lambda: hash_batch(passwords, 0))
+        pooled = best_of(lambda: hash_batch(passwords, 1))
+        print(f"{size:>10} {serial:>10.1f} {pooled:>10.1f} {serial / pooled:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
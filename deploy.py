@@ -234,16 +234,14 @@ source venv/bin/activate
 echo "Installing dependencies..."
 pip install -r requirements.txt
 
-# Initialize database if it doesn't exist
-if [ ! -f "starcomm_training.db" ]; then
-    echo "Initializing database..."
-    python src/init_database.py
-fi
+# Create tables, apply migrations and seed (once, before the workers start)
+echo "Initializing database..."
+flask --app src.main init-db
 
 # Start the application with gunicorn for production
 echo "Starting application with gunicorn..."
 pip install gunicorn
-gunicorn --bind 0.0.0.0:${PORT:-5000} --workers 4 --timeout 120 src.main:app
+gunicorn --bind 0.0.0.0:${PORT:-5000} --workers 4 --timeout 120 'src.main:create_app()'
 """
     
     with open('start-prod.sh', 'w') as f:
@@ -8,6 +8,8 @@ import sys
 sys.path.insert(0, os.path.dirname(__file__))
 
 from src.models.database import db, TrainingModule, Company, Employee, EmployeeProgress, EmployeeNotes
+from src.models.migrations import run_migrations
+from src.models.engine import normalize_database_url
 from src.utils.security import PasswordSecurity
 from flask import Flask
 import json
@@ -188,12 +190,35 @@ def create_default_companies():
     
     return created_companies
 
+def seed_render_database():
+    """Create tables, apply migrations and seed default data (inside an app context)"""
+    # Create all tables
+    db.create_all()
+    print("All database tables created successfully!")
+    print(f"Schema version: {run_migrations()}")
+    
+    # Check if training modules already exist
+    if TrainingModule.query.count() == 0:
+        create_default_training_modules()
+    else:
+        print("Training modules already exist in database.")
+    
+    # Check if companies exist
+    if Company.query.count() == 0:
+        companies = create_default_companies()
+        print(f"\n=== IMPORTANT: Save these credentials for testing ===")
+        for company in companies:
+            print(f"Company ID: {company['id']}, Name: {company['name']}, Password: {company['password']}")
+        print("=" * 60)
+    else:
+        print("Companies already exist in database.")
+
 def init_render_database():
     """Initialize the database for Render deployment"""
     app = Flask(__name__)
     
     # Use DATABASE_URL from environment (Render provides this)
-    DATABASE_URL = os.environ.get('DATABASE_URL')
+    DATABASE_URL = normalize_database_url(os.environ.get('DATABASE_URL'))
     if not DATABASE_URL:
         print("ERROR: DATABASE_URL environment variable not found!")
         print("This script is designed for Render deployment with PostgreSQL.")
@@ -205,25 +230,7 @@ def init_render_database():
     db.init_app(app)
     
     with app.app_context():
-        # Create all tables
-        db.create_all()
-        print("All database tables created successfully!")
-        
-        # Check if training modules already exist
-        if TrainingModule.query.count() == 0:
-            create_default_training_modules()
-        else:
-            print("Training modules already exist in database.")
-        
-        # Check if companies exist
-        if Company.query.count() == 0:
-            companies = create_default_companies()
-            print(f"\n=== IMPORTANT: Save these credentials for testing ===")
-            for company in companies:
-                print(f"Company ID: {company['id']}, Name: {company['name']}, Password: {company['password']}")
-            print("=" * 60)
-        else:
-            print("Companies already exist in database.")
+        seed_render_database()
 
 if __name__ == '__main__':
     init_render_database()
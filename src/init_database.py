@@ -3,6 +3,7 @@ import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from src.models.database import db, TrainingModule, Company, Employee, EmployeeProgress, EmployeeNotes
+from src.models.migrations import run_migrations
 from src.utils.security import PasswordSecurity
 from flask import Flask
 import json
@@ -612,6 +613,29 @@ def create_default_company():
     
     return test_company, password
 
+def seed_database():
+    """Create tables, apply migrations and seed default data (inside an app context)"""
+    # Create all tables
+    db.create_all()
+    print("All database tables created successfully!")
+    print(f"Schema version: {run_migrations()}")
+    
+    # Check if training modules already exist
+    if TrainingModule.query.count() == 0:
+        create_default_training_modules()
+    else:
+        print("Training modules already exist in database.")
+    
+    # Check if companies exist
+    if Company.query.count() == 0:
+        company, password = create_default_company()
+        print(f"\n=== IMPORTANT: Save these credentials for testing ===")
+        print(f"Company ID: {company.id}")
+        print(f"Company Password: {password}")
+        print("=" * 50)
+    else:
+        print("Companies already exist in database.")
+
 def init_database():
     """Initialize the database with default data"""
     app = Flask(__name__)
@@ -621,25 +645,7 @@ def init_database():
     db.init_app(app)
     
     with app.app_context():
-        # Create all tables
-        db.create_all()
-        print("All database tables created successfully!")
-        
-        # Check if training modules already exist
-        if TrainingModule.query.count() == 0:
-            create_default_training_modules()
-        else:
-            print("Training modules already exist in database.")
-        
-        # Check if companies exist
-        if Company.query.count() == 0:
-            company, password = create_default_company()
-            print(f"\n=== IMPORTANT: Save these credentials for testing ===")
-            print(f"Company ID: {company.id}")
-            print(f"Company Password: {password}")
-            print("=" * 50)
-        else:
-            print("Companies already exist in database.")
+        seed_database()
 
 if __name__ == '__main__':
     init_database()
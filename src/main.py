@@ -1,15 +1,22 @@
 import os
 import sys
+import click
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from flask import Flask, send_from_directory, jsonify, request
 from flask_cors import CORS
 from src.models.database import db, TrainingModule
+from src.models.migrations import check_schema_version
+from src.models.engine import normalize_database_url, engine_options, configure_engine
 from src.routes.master_admin import master_admin_bp
 from src.routes.company_admin import company_admin_bp
 from src.routes.employee import employee_bp
 from src.utils.security import apply_security_headers, RateLimiter, AuditLogger, rate_limiter
+from src.utils.http_cache import module_catalogue, compress_json_responses
+from src.utils.static_assets import static_assets
+from src.utils.email_queue import start_email_queue_worker
+from src.utils.progress_tracking import start_progress_flusher
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 app.config['SECRET_KEY'] = 'starcomm-training-system-secret-key-2024'
@@ -18,7 +25,7 @@ app.config['SECRET_KEY'] = 'starcomm-training-system-secret-key-2024'
 CORS(app, origins="*", allow_headers=["Content-Type", "Authorization", "X-CSRF-Token"])
 
 # Database configuration - support both SQLite (local) and PostgreSQL (Render)
-DATABASE_URL = os.environ.get('DATABASE_URL')
+DATABASE_URL = normalize_database_url(os.environ.get('DATABASE_URL'))
 if DATABASE_URL:
     # Production (Render) - PostgreSQL
     app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URL
@@ -27,9 +34,13 @@ else:
     db_path = os.path.join(os.path.dirname(__file__), 'database', 'app.db')
     app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Pool sizing/recycling from the environment; WAL mode for file SQLite
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
 
 # Initialize database
 db.init_app(app)
+with app.app_context():
+    configure_engine(db.engine)
 
 # Register blueprints
 app.register_blueprint(master_admin_bp, url_prefix='/api/master')
@@ -39,12 +50,15 @@ app.register_blueprint(employee_bp, url_prefix='/api/employee')
 # Apply security middleware
 apply_security_headers(app)
 
+# Gzip large JSON API responses
+compress_json_responses(app)
+
 # Rate limiting for sensitive endpoints
 @app.before_request
 def before_request():
     # Apply rate limiting to login endpoints
     if request.endpoint and 'login' in request.endpoint:
-        if rate_limiter.is_rate_limited(request.remote_addr, max_attempts=5, window_minutes=5):
+        if rate_limiter.is_rate_limited(request.remote_addr, max_attempts=5, window_minutes=5, scope='login'):
             return jsonify({
                 'error': 'Too many login attempts. Please try again in 5 minutes.',
                 'retry_after': 300
@@ -55,23 +69,14 @@ def before_request():
 def get_training_modules():
     """Get all available training modules"""
     try:
-        modules = TrainingModule.query.all()
-        modules_data = []
-        
-        for module in modules:
-            modules_data.append({
-                'id': module.id,
-                'title': module.title,
-                'description': module.description,
-                'category': module.category,
-                'duration_minutes': module.duration_minutes,
-                'difficulty_level': module.difficulty_level,
-                'passing_score': module.passing_score
-            })
-        
-        return jsonify({
-            'success': True,
-            'modules': modules_data
+        return module_catalogue.response('summary', lambda module: {
+            'id': module.id,
+            'title': module.title,
+            'description': module.description,
+            'category': module.category,
+            'duration_minutes': module.duration_minutes,
+            'difficulty_level': module.difficulty_level,
+            'passing_score': module.passing_score
         })
     except Exception as e:
         return jsonify({
@@ -185,19 +190,77 @@ def init_database():
             'error': str(e)
         }), 500
 
+@app.cli.command('rebuild-training-stats')
+def rebuild_training_stats():
+    """Rebuild the precomputed training statistics and verify them"""
+    from src.utils.training_stats import TrainingStats
+    
+    TrainingStats.rebuild()
+    mismatches = TrainingStats.verify()
+    for mismatch in mismatches:
+        print(f"MISMATCH: {mismatch}")
+    print(f"Training statistics rebuilt ({len(mismatches)} mismatches after rebuild)")
+    if mismatches:
+        sys.exit(1)
+
+@app.cli.command('render-certificates')
+@click.option('--company-id', 'company_ids', multiple=True, type=int, help='Limit to these companies (repeatable)')
+def render_certificates(company_ids):
+    """Pre-render certificate PDFs for every completed module"""
+    from src.models.database import Company
+    from src.utils.certificates import certificate_store
+    
+    if not company_ids:
+        company_ids = [company_id for (company_id,) in db.session.query(Company.id).order_by(Company.id)]
+    for company_id in company_ids:
+        rendered, cached = certificate_store.prerender_company(company_id)
+        print(f"Company {company_id}: {rendered} certificates rendered, {cached} already cached")
+
+@app.cli.command('build-assets')
+def build_assets():
+    """Fingerprint and precompress static CSS/JS into src/static/dist (deploy step)"""
+    manifest = static_assets.build()
+    print(f"Built {len(manifest)} assets into {static_assets.dist_folder}")
+
+@app.cli.command('send-reminders')
+@click.option('--company-id', 'company_ids', multiple=True, type=int, help='Limit to these companies (repeatable)')
+@click.option('--due-days', default=14, show_default=True, help='Incomplete training older than this is overdue')
+@click.option('--rate', default=5.0, show_default=True, help='Messages per second')
+@click.option('--resume', 'resume_id', type=int, help='Resume an interrupted campaign by id')
+def send_reminders(company_ids, due_days, rate, resume_id):
+    """Queue reminder emails for overdue training"""
+    from src.models.database import ReminderCampaign
+    from src.utils.reminder_campaigns import ReminderCampaignRunner
+    
+    campaign_id = resume_id or ReminderCampaignRunner.create(list(company_ids), due_days, rate).id
+    runner = ReminderCampaignRunner(app, campaign_id)
+    if not runner.claim():
+        campaign = db.session.get(ReminderCampaign, campaign_id)
+        print(f"Campaign {campaign_id} cannot be resumed: {campaign.status if campaign else 'not found'}")
+        sys.exit(1)
+    runner.run()
+    campaign = db.session.get(ReminderCampaign, campaign_id)
+    print(f"Campaign {campaign.id}: {campaign.status}, {campaign.messages_queued} reminders queued, "
+          f"checkpoint employee {campaign.checkpoint_employee_id}")
+
 # Serve static files
 @app.route('/')
 def serve_index():
-    return send_from_directory(app.static_folder, 'index.html')
+    return static_assets.send_index()
 
 @app.route('/<path:path>')
 def serve_static(path):
     try:
+        # Content-hashed build output never changes
+        if static_assets.is_fingerprinted(path):
+            return static_assets.send_asset(path)
+        if path == 'index.html':
+            return static_assets.send_index()
         return send_from_directory(app.static_folder, path)
     except:
         # For SPA routing, return index.html for non-API routes
         if not path.startswith('api/'):
-            return send_from_directory(app.static_folder, 'index.html')
+            return static_assets.send_index()
         return jsonify({'error': 'Not found'}), 404
 
 # Error handlers
@@ -205,7 +268,7 @@ def serve_static(path):
 def not_found(error):
     if request.path.startswith('/api/'):
         return jsonify({'error': 'API endpoint not found'}), 404
-    return send_from_directory(app.static_folder, 'index.html')
+    return static_assets.send_index()
 
 @app.errorhandler(500)
 def internal_error(error):
@@ -215,132 +278,42 @@ def internal_error(error):
 def rate_limit_error(error):
     return jsonify({'error': 'Rate limit exceeded'}), 429
 
-def init_database():
-    """Initialize database with default data"""
-    from src.models.database import Company, Employee, EmployeeProgress, EmployeeNotes
-    from src.utils.security import PasswordSecurity
-    import string
-    import secrets
-    import json
-    
-    # Create all tables
-    db.create_all()
+def seed_database():
+    """Create tables, apply migrations and seed default data (inside an app context)"""
+    if DATABASE_URL:
+        from init_render_db import seed_render_database
+        seed_render_database()
+    else:
+        from src.init_database import seed_database as seed_local_database
+        seed_local_database()
+
+@app.cli.command('init-db')
+def init_db():
+    """Create tables, apply migrations and seed default data (one-shot deploy step)"""
+    seed_database()
+
+def create_app():
+    """Prepare the app for serving and return it (gunicorn 'src.main:create_app()').
     
-    # Check if training modules already exist
-    if TrainingModule.query.count() == 0:
-        # Create default training modules
-        phishing_questions = [
-            {
-                "question": "What is the most common sign of a phishing email?",
-                "type": "multiple_choice",
-                "options": [
-                    "Urgent language demanding immediate action",
-                    "Professional company logo",
-                    "Correct spelling and grammar",
-                    "Familiar sender address"
-                ],
-                "correct_answer": 0,
-                "explanation": "Phishing emails often use urgent language to pressure recipients into acting quickly without thinking."
-            },
-            {
-                "question": "You should always click on links in emails from unknown senders.",
-                "type": "true_false",
-                "correct_answer": False,
-                "explanation": "Never click on links from unknown senders as they may lead to malicious websites."
-            }
-        ]
-        
-        phishing_module = TrainingModule(
-            title="Phishing Awareness",
-            description="Learn to identify and avoid phishing attacks through email and social media scams.",
-            video_url="/static/videos/phishing-awareness.mp4",
-            duration_minutes=20,
-            difficulty_level="Beginner",
-            category="Phishing",
-            quiz_questions=json.dumps(phishing_questions),
-            passing_score=70
-        )
-        
-        password_questions = [
-            {
-                "question": "What makes a strong password?",
-                "type": "multiple_choice",
-                "options": [
-                    "At least 8 characters with mixed case, numbers, and symbols",
-                    "Your birthday and name",
-                    "A common dictionary word",
-                    "The same password for all accounts"
-                ],
-                "correct_answer": 0,
-                "explanation": "Strong passwords should be long and include a mix of character types."
-            }
-        ]
-        
-        password_module = TrainingModule(
-            title="Password Security",
-            description="Learn best practices for creating strong passwords and using password managers effectively.",
-            video_url="/static/videos/password-security.mp4",
-            duration_minutes=15,
-            difficulty_level="Beginner",
-            category="Passwords",
-            quiz_questions=json.dumps(password_questions),
-            passing_score=70
-        )
-        
-        db.session.add(phishing_module)
-        db.session.add(password_module)
-        db.session.commit()
-        print("Default training modules created!")
+    Importing this module does not touch the database. Serving processes only
+    check that the schema version is current; schema creation and seeding run
+    once per deploy via 'flask --app src.main init-db'. Set
+    DB_INIT_ON_STARTUP=true to initialize in-process instead (single-process
+    deployments and local development).
+    """
+    with app.app_context():
+        if os.getenv('DB_INIT_ON_STARTUP', 'false').lower() == 'true':
+            seed_database()
+        else:
+            check_schema_version()
     
-    # Check if companies exist
-    if Company.query.count() == 0:
-        # Create default test companies
-        companies_data = [
-            {
-                "name": "TechCorp Solutions",
-                "contact_email": "admin@techcorp.com",
-                "industry": "Technology",
-                "employee_count": 150
-            },
-            {
-                "name": "Healthcare Plus",
-                "contact_email": "admin@healthcareplus.com", 
-                "industry": "Healthcare",
-                "employee_count": 75
-            }
-        ]
-        
-        for company_data in companies_data:
-            # Generate a random password for the company
-            alphabet = string.ascii_letters + string.digits
-            password = ''.join(secrets.choice(alphabet) for i in range(12))
-            
-            # Hash the password
-            hashed_password = PasswordSecurity.hash_password(password)
-            
-            # Create the company
-            company = Company(
-                name=company_data["name"],
-                admin_password=hashed_password,
-                contact_email=company_data["contact_email"],
-                industry=company_data["industry"],
-                employee_count=company_data["employee_count"],
-                is_active=True
-            )
-            
-            db.session.add(company)
-            db.session.flush()  # Get the ID
-            
-            print(f"Created company: ID={company.id}, Name={company.name}, Password={password}")
-        
-        db.session.commit()
-        print("Default companies created!")
-
-# Initialize database on startup
-with app.app_context():
-    init_database()
+    # Deliver queued emails and flush buffered progress heartbeats in the background
+    start_email_queue_worker(app)
+    start_progress_flusher(app)
+    return app
 
 if __name__ == '__main__':
-    # Run the application
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    # The development server initializes the database itself
+    os.environ.setdefault('DB_INIT_ON_STARTUP', 'true')
+    create_app().run(host='0.0.0.0', port=5000, debug=True)
 
@@ -1,6 +1,9 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.orm import Session, joinedload
 from datetime import datetime
 import json
+from src.models.quiz_cache import quiz_cache
 
 db = SQLAlchemy()
 
@@ -50,8 +53,12 @@ class Employee(db.Model):
     # Relationship
     progress = db.relationship('EmployeeProgress', backref='employee', lazy=True, cascade='all, delete-orphan')
     
-    # Unique constraint for email per company
-    __table_args__ = (db.UniqueConstraint('company_id', 'email', name='unique_company_email'),)
+    # Unique constraint for email per company, plus indexes for hot lookups
+    __table_args__ = (
+        db.UniqueConstraint('company_id', 'email', name='unique_company_email'),
+        db.Index('ix_employees_company_department', 'company_id', 'department'),
+        db.Index('ix_employees_email', 'email'),
+    )
     
     def __repr__(self):
         return f'<Employee {self.name}>'
@@ -90,18 +97,18 @@ class TrainingModule(db.Model):
     def __repr__(self):
         return f'<TrainingModule {self.title}>'
     
+    def get_compiled_quiz(self):
+        """Parsed, validated quiz with answer key (cached per module version)"""
+        return quiz_cache.get(self.id, self.quiz_questions)
+    
     def get_quiz_questions(self):
-        """Parse quiz questions from JSON string"""
-        if self.quiz_questions:
-            try:
-                return json.loads(self.quiz_questions)
-            except json.JSONDecodeError:
-                return []
-        return []
+        """Parse quiz questions from JSON string (shared cached list, do not mutate)"""
+        return self.get_compiled_quiz().questions
     
     def set_quiz_questions(self, questions):
         """Set quiz questions as JSON string"""
         self.quiz_questions = json.dumps(questions)
+        quiz_cache.invalidate(self.id)
     
     def to_dict(self):
         return {
@@ -131,14 +138,25 @@ class EmployeeProgress(db.Model):
     time_spent_minutes = db.Column(db.Integer, default=0)
     is_completed = db.Column(db.Boolean, default=False)
     last_position = db.Column(db.Integer, default=0)  # For resume functionality
+    position_updated_at = db.Column(db.DateTime)  # when last_position was written; stale heartbeats skip newer rows
     notes = db.Column(db.Text)  # For note-taking capability
     
-    # Unique constraint for employee-module combination
-    __table_args__ = (db.UniqueConstraint('employee_id', 'module_id', name='unique_employee_module'),)
+    # Unique constraint for employee-module combination, plus indexes for hot lookups
+    __table_args__ = (
+        db.UniqueConstraint('employee_id', 'module_id', name='unique_employee_module'),
+        db.Index('ix_employee_progress_employee_completed_started', 'employee_id', 'is_completed', 'started_date'),
+        db.Index('ix_employee_progress_module_completed', 'module_id', 'is_completed'),
+    )
     
     def __repr__(self):
         return f'<EmployeeProgress Employee:{self.employee_id} Module:{self.module_id}>'
     
+    @staticmethod
+    def load_related(*relationships):
+        """Loader options that fetch the given many-to-one relationships ('employee',
+        'module') in the same query, instead of one lookup per progress row"""
+        return [joinedload(getattr(EmployeeProgress, name)) for name in relationships]
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -165,6 +183,8 @@ class EmployeeNotes(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (db.Index('ix_employee_notes_employee_module', 'employee_id', 'module_id'),)
+    
     def __repr__(self):
         return f'<EmployeeNotes {self.employee_id}-{self.module_id}>'
     
@@ -178,6 +198,225 @@ class EmployeeNotes(db.Model):
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
+# Precomputed training statistics, maintained incrementally with progress changes
+class CompanyTrainingStats(db.Model):
+    __tablename__ = 'company_training_stats'
+    
+    company_id = db.Column(db.Integer, db.ForeignKey('companies.id'), primary_key=True, autoincrement=False)
+    assigned_count = db.Column(db.Integer, nullable=False, default=0)
+    completed_count = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<CompanyTrainingStats {self.company_id}>'
+    
+    def to_dict(self):
+        return {
+            'company_id': self.company_id,
+            'assigned_count': self.assigned_count,
+            'completed_count': self.completed_count
+        }
+
+class ModuleCompanyStats(db.Model):
+    __tablename__ = 'module_company_stats'
+    
+    company_id = db.Column(db.Integer, db.ForeignKey('companies.id'), primary_key=True, autoincrement=False)
+    module_id = db.Column(db.Integer, db.ForeignKey('training_modules.id'), primary_key=True, autoincrement=False)
+    assigned_count = db.Column(db.Integer, nullable=False, default=0)
+    completed_count = db.Column(db.Integer, nullable=False, default=0)
+    
+    __table_args__ = (db.Index('ix_module_company_stats_module', 'module_id'),)
+    
+    def __repr__(self):
+        return f'<ModuleCompanyStats {self.company_id}-{self.module_id}>'
+    
+    def to_dict(self):
+        return {
+            'company_id': self.company_id,
+            'module_id': self.module_id,
+            'assigned_count': self.assigned_count,
+            'completed_count': self.completed_count
+        }
+
+# Background bulk import job
+class ImportJob(db.Model):
+    __tablename__ = 'import_jobs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    company_id = db.Column(db.Integer, db.ForeignKey('companies.id'), nullable=False)
+    filename = db.Column(db.String(255))
+    status = db.Column(db.String(20), default='queued')  # queued/running/completed/failed
+    processed_rows = db.Column(db.Integer, default=0)
+    imported_count = db.Column(db.Integer, default=0)
+    error_count = db.Column(db.Integer, default=0)
+    errors = db.Column(db.Text)  # JSON list, capped
+    created_date = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_date = db.Column(db.DateTime)
+    
+    def __repr__(self):
+        return f'<ImportJob {self.id} {self.status}>'
+    
+    def get_errors(self):
+        """Parse errors from JSON string"""
+        if self.errors:
+            try:
+                return json.loads(self.errors)
+            except json.JSONDecodeError:
+                return []
+        return []
+    
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'company_id': self.company_id,
+            'filename': self.filename,
+            'status': self.status,
+            'processed_rows': self.processed_rows,
+            'imported_count': self.imported_count,
+            'error_count': self.error_count,
+            'errors': self.get_errors(),
+            'created_date': self.created_date.isoformat() if self.created_date else None,
+            'finished_date': self.finished_date.isoformat() if self.finished_date else None
+        }
+
+# Durable outbound email queue
+class OutboundEmail(db.Model):
+    __tablename__ = 'outbound_emails'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    to_email = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(255), nullable=False)
+    html_content = db.Column(db.Text, nullable=False)
+    text_content = db.Column(db.Text)
+    attachments = db.Column(db.Text)  # JSON list of file paths
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued/sending/sent/failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow)
+    claimed_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_date = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_date = db.Column(db.DateTime)
+    
+    __table_args__ = (db.Index('ix_outbound_emails_status_next_attempt', 'status', 'next_attempt_at'),)
+    
+    def __repr__(self):
+        return f'<OutboundEmail {self.id} {self.status}>'
+    
+    def get_attachments(self):
+        """Parse attachment paths from JSON string"""
+        if self.attachments:
+            try:
+                return json.loads(self.attachments)
+            except json.JSONDecodeError:
+                return []
+        return []
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'to_email': self.to_email,
+            'subject': self.subject,
+            'status': self.status,
+            'attempts': self.attempts,
+            'next_attempt_at': self.next_attempt_at.isoformat() if self.next_attempt_at else None,
+            'last_error': self.last_error,
+            'created_date': self.created_date.isoformat() if self.created_date else None,
+            'sent_date': self.sent_date.isoformat() if self.sent_date else None
+        }
+
+# Bulk reminder campaign for overdue training, resumable from its checkpoint
+class ReminderCampaign(db.Model):
+    __tablename__ = 'reminder_campaigns'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    company_ids = db.Column(db.Text)  # JSON list, null means all companies
+    due_days = db.Column(db.Integer, nullable=False, default=14)
+    rate_per_second = db.Column(db.Float, nullable=False, default=5.0)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending/running/completed/failed
+    checkpoint_employee_id = db.Column(db.Integer, nullable=False, default=0)
+    recipients_processed = db.Column(db.Integer, nullable=False, default=0)
+    messages_queued = db.Column(db.Integer, nullable=False, default=0)
+    last_scheduled_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    heartbeat_at = db.Column(db.DateTime)  # refreshed by the running runner; a stale value releases the claim
+    created_date = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_date = db.Column(db.DateTime)
+    
+    def __repr__(self):
+        return f'<ReminderCampaign {self.id} {self.status}>'
+    
+    def get_company_ids(self):
+        """Parse company ids from JSON string (None means all companies)"""
+        if self.company_ids:
+            try:
+                return json.loads(self.company_ids)
+            except json.JSONDecodeError:
+                return None
+        return None
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'company_ids': self.get_company_ids(),
+            'due_days': self.due_days,
+            'rate_per_second': self.rate_per_second,
+            'status': self.status,
+            'checkpoint_employee_id': self.checkpoint_employee_id,
+            'recipients_processed': self.recipients_processed,
+            'messages_queued': self.messages_queued,
+            'last_error': self.last_error,
+            'created_date': self.created_date.isoformat() if self.created_date else None,
+            'finished_date': self.finished_date.isoformat() if self.finished_date else None
+        }
+
+# Shared rate limit counters (sliding window counter, one row per key per window)
+class RateLimitCounter(db.Model):
+    __tablename__ = 'rate_limit_counters'
+    
+    key = db.Column(db.String(255), primary_key=True)
+    window_index = db.Column(db.BigInteger, primary_key=True, autoincrement=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    expires_at = db.Column(db.Float, nullable=False)  # epoch seconds
+    
+    __table_args__ = (db.Index('ix_rate_limit_counters_expires_at', 'expires_at'),)
+    
+    def __repr__(self):
+        return f'<RateLimitCounter {self.key}@{self.window_index}>'
+
+# Training module catalogue version, bumped whenever a module changes
+class CatalogueVersion(db.Model):
+    __tablename__ = 'catalogue_version'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)  # single row, id=1
+    version = db.Column(db.Integer, nullable=False, default=1)
+    updated_date = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<CatalogueVersion {self.version}>'
+
+@event.listens_for(Session, 'after_flush')
+def bump_catalogue_version(session, flush_context):
+    """Bump the catalogue version in the same transaction as any module change"""
+    changed = list(session.new) + list(session.dirty) + list(session.deleted)
+    if any(isinstance(obj, TrainingModule) for obj in changed):
+        table = CatalogueVersion.__table__
+        session.connection().execute(
+            table.update().where(table.c.id == 1).values(
+                version=table.c.version + 1,
+                updated_date=datetime.utcnow()
+            )
+        )
+
+# Applied schema migrations
+class SchemaVersion(db.Model):
+    __tablename__ = 'schema_version'
+    
+    version = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    description = db.Column(db.String(200))
+    applied_date = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<SchemaVersion {self.version}>'
+
 # Master Admin credentials (for simplicity, stored as constants)
 MASTER_ADMIN_USERNAME = "admin"
 MASTER_ADMIN_PASSWORD = "admin123"  # This should be hashed in production
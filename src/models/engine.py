@@ -0,0 +1,164 @@
+"""
+Database engine configuration for Starcomm Training System
+
+Pool sizing, overflow, recycling and pre-ping come from the environment so
+they can be matched to the number of gunicorn workers and the Postgres
+connection limit. Checkout waits, connects and invalidations are recorded
+per process for the pool metrics endpoint. File-backed SQLite databases
+(the docker-compose deployment) run in WAL mode with a busy timeout.
+"""
+
+import bisect
+import os
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+# Upper bounds (ms) of the checkout wait histogram buckets; the last bucket is +Inf
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+
+def _env_bool(name, default):
+    return os.getenv(name, default).lower() == 'true'
+
+
+def normalize_database_url(url):
+    """Render/Heroku style postgres:// URLs are rejected by SQLAlchemy 2"""
+    if url and url.startswith('postgres://'):
+        return 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def is_file_sqlite(url):
+    return url.startswith('sqlite') and ':memory:' not in url and url.rstrip('/') != 'sqlite:'
+
+
+def engine_options(url):
+    """SQLALCHEMY_ENGINE_OPTIONS for the given database URL"""
+    if url.startswith('sqlite'):
+        if not is_file_sqlite(url):
+            return {}
+        return {
+            'poolclass': TimedQueuePool,
+            'pool_size': int(os.getenv('DB_POOL_SIZE', '5')),
+            'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '10')),
+            'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', '30')),
+            # sqlite3's own busy handler, in seconds
+            'connect_args': {'timeout': int(os.getenv('DB_SQLITE_BUSY_TIMEOUT_MS', '5000')) / 1000.0},
+        }
+
+    return {
+        'poolclass': TimedQueuePool,
+        'pool_size': int(os.getenv('DB_POOL_SIZE', '5')),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '10')),
+        'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', '30')),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '1800')),
+        'pool_pre_ping': _env_bool('DB_POOL_PRE_PING', 'true'),
+    }
+
+
+class PoolMetrics:
+    """Per-process counters and checkout wait histogram for the connection pool"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.bucket_counts = [0] * (len(WAIT_BUCKETS_MS) + 1)
+            self.wait_count = 0
+            self.wait_sum_ms = 0.0
+            self.wait_max_ms = 0.0
+            self.timeouts = 0
+            self.connects = 0
+            self.invalidations = 0
+
+    def record_wait(self, elapsed_ms):
+        with self.lock:
+            self.bucket_counts[bisect.bisect_left(WAIT_BUCKETS_MS, elapsed_ms)] += 1
+            self.wait_count += 1
+            self.wait_sum_ms += elapsed_ms
+            self.wait_max_ms = max(self.wait_max_ms, elapsed_ms)
+
+    def record_timeout(self):
+        with self.lock:
+            self.timeouts += 1
+
+    def record_connect(self, *args):
+        with self.lock:
+            self.connects += 1
+
+    def record_invalidation(self, *args):
+        with self.lock:
+            self.invalidations += 1
+
+    def snapshot(self, engine):
+        """Current pool state plus cumulative checkout statistics"""
+        pool = engine.pool
+        with self.lock:
+            cumulative = 0
+            buckets = []
+            for bound, count in zip(list(WAIT_BUCKETS_MS) + ['+Inf'], self.bucket_counts):
+                cumulative += count
+                buckets.append({'le_ms': bound, 'count': cumulative})
+            checkout_wait = {
+                'count': self.wait_count,
+                'sum_ms': round(self.wait_sum_ms, 3),
+                'max_ms': round(self.wait_max_ms, 3),
+                'avg_ms': round(self.wait_sum_ms / self.wait_count, 3) if self.wait_count else 0,
+                'buckets': buckets
+            }
+            counters = {
+                'timeouts': self.timeouts,
+                'connects': self.connects,
+                'invalidations': self.invalidations
+            }
+
+        state = {'pool_class': type(pool).__name__, 'pid': os.getpid()}
+        if isinstance(pool, QueuePool):
+            state.update({
+                'size': pool.size(),
+                'checked_in': pool.checkedin(),
+                'checked_out': pool.checkedout(),
+                'overflow': max(pool.overflow(), 0),
+                'max_overflow': pool._max_overflow,
+                'timeout_seconds': pool.timeout()
+            })
+        return dict(state, checkout_wait=checkout_wait, **counters)
+
+
+# Global pool metrics instance
+pool_metrics = PoolMetrics()
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waits for a connection"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            pool_metrics.record_timeout()
+            raise
+        finally:
+            pool_metrics.record_wait((time.perf_counter() - started) * 1000)
+
+
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute(f"PRAGMA busy_timeout={int(os.getenv('DB_SQLITE_BUSY_TIMEOUT_MS', '5000'))}")
+    cursor.close()
+
+
+def configure_engine(engine):
+    """Install pool event listeners (and SQLite pragmas) on an engine"""
+    event.listen(engine, 'connect', pool_metrics.record_connect)
+    event.listen(engine, 'invalidate', pool_metrics.record_invalidation)
+    if is_file_sqlite(str(engine.url)) and _env_bool('DB_SQLITE_WAL', 'true'):
+        event.listen(engine, 'connect', _sqlite_pragmas)
@@ -0,0 +1,133 @@
+"""
+Versioned schema migrations for Starcomm Training System
+
+Each migration is a list of idempotent SQL statements that work on both
+SQLite and PostgreSQL, or a {dialect: statements} mapping when the two need
+different SQL. A statement may also be a callable taking the session, for
+changes SQL cannot make idempotently on every dialect. Applied versions are
+recorded in schema_version.
+"""
+
+import logging
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from src.models.database import db, SchemaVersion
+
+logger = logging.getLogger(__name__)
+
+
+def add_column(table, column, ddl_type):
+    """Migration step adding a column unless create_all already made it"""
+    def apply(session):
+        columns = {c['name'] for c in inspect(session.connection()).get_columns(table)}
+        if column not in columns:
+            session.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {ddl_type}'))
+    return apply
+
+
+MIGRATIONS = [
+    (1, 'Composite indexes for hot query paths', [
+        'CREATE INDEX IF NOT EXISTS ix_employees_company_department ON employees (company_id, department)',
+        'CREATE INDEX IF NOT EXISTS ix_employees_email ON employees (email)',
+        'CREATE INDEX IF NOT EXISTS ix_employee_progress_employee_completed_started '
+        'ON employee_progress (employee_id, is_completed, started_date)',
+        'CREATE INDEX IF NOT EXISTS ix_employee_progress_module_completed '
+        'ON employee_progress (module_id, is_completed)',
+        'CREATE INDEX IF NOT EXISTS ix_employee_notes_employee_module ON employee_notes (employee_id, module_id)',
+    ]),
+    (2, 'Backfill precomputed training statistics', [
+        'DELETE FROM module_company_stats',
+        'DELETE FROM company_training_stats',
+        'INSERT INTO module_company_stats (company_id, module_id, assigned_count, completed_count) '
+        'SELECT e.company_id, p.module_id, COUNT(p.id), SUM(CASE WHEN p.is_completed THEN 1 ELSE 0 END) '
+        'FROM employee_progress p JOIN employees e ON e.id = p.employee_id '
+        'GROUP BY e.company_id, p.module_id',
+        'INSERT INTO company_training_stats (company_id, assigned_count, completed_count) '
+        'SELECT company_id, SUM(assigned_count), SUM(completed_count) '
+        'FROM module_company_stats GROUP BY company_id',
+    ]),
+    (3, 'Seed the training module catalogue version', [
+        'INSERT INTO catalogue_version (id, version, updated_date) '
+        'SELECT 1, 1, CURRENT_TIMESTAMP '
+        'WHERE NOT EXISTS (SELECT 1 FROM catalogue_version WHERE id = 1)',
+    ]),
+    (4, 'Company name search indexes', {
+        'postgresql': [
+            # pg_trgm may be unavailable to this role; search then falls back to prefix matching
+            "DO $$ BEGIN CREATE EXTENSION IF NOT EXISTS pg_trgm; "
+            "EXCEPTION WHEN OTHERS THEN RAISE NOTICE 'pg_trgm unavailable: %', SQLERRM; END $$",
+            "DO $$ BEGIN IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm') THEN "
+            "CREATE INDEX IF NOT EXISTS ix_companies_name_trgm ON companies USING gin (name gin_trgm_ops); "
+            "END IF; END $$",
+            'CREATE INDEX IF NOT EXISTS ix_companies_name_prefix ON companies (lower(name) text_pattern_ops)',
+        ],
+        'sqlite': [
+            'CREATE INDEX IF NOT EXISTS ix_companies_name_nocase ON companies (name COLLATE NOCASE)',
+        ],
+    }),
+    (5, 'Reminder campaign run lease', [
+        add_column('reminder_campaigns', 'heartbeat_at', 'TIMESTAMP'),
+    ]),
+    (6, 'Progress position write timestamps', [
+        add_column('employee_progress', 'position_updated_at', 'TIMESTAMP'),
+    ]),
+]
+
+
+def current_version():
+    """Highest applied migration version (0 if none)"""
+    return db.session.query(db.func.coalesce(db.func.max(SchemaVersion.version), 0)).scalar()
+
+
+def latest_version():
+    """Highest migration version known to this code"""
+    return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+def check_schema_version():
+    """Cheap startup check for serving processes: one read of schema_version.
+
+    Raises RuntimeError if the database has not been migrated to this code's
+    version; schema creation and seeding are a separate deploy step.
+    """
+    try:
+        version = current_version()
+    except SQLAlchemyError:
+        # schema_version does not exist yet
+        db.session.rollback()
+        version = 0
+    finally:
+        db.session.remove()
+
+    if version < latest_version():
+        raise RuntimeError(
+            f"Database schema is at version {version} but this release needs {latest_version()}; "
+            f"run 'flask --app src.main init-db' before starting workers"
+        )
+    return version
+
+
+def run_migrations():
+    """Apply pending migrations in order; safe to run repeatedly and concurrently"""
+    SchemaVersion.__table__.create(db.engine, checkfirst=True)
+    applied = {version for (version,) in db.session.query(SchemaVersion.version).all()}
+
+    for version, description, statements in MIGRATIONS:
+        if version in applied:
+            continue
+        if isinstance(statements, dict):
+            statements = statements.get(db.engine.dialect.name, [])
+        try:
+            for statement in statements:
+                if callable(statement):
+                    statement(db.session)
+                else:
+                    db.session.execute(text(statement))
+            db.session.add(SchemaVersion(version=version, description=description))
+            db.session.commit()
+            logger.info(f"Applied schema migration {version}: {description}")
+        except IntegrityError:
+            # Another process recorded this version first
+            db.session.rollback()
+
+    return current_version()
@@ -0,0 +1,91 @@
+"""
+Parsed quiz cache for Starcomm Training System
+
+Quiz questions are stored as JSON text on TrainingModule. Parsing and
+validating them once per module version and keeping a precompiled answer
+key avoids re-reading the JSON on every listing and quiz submission.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+
+class CompiledQuiz:
+    """Validated quiz questions plus an answer key for grading"""
+
+    def __init__(self, questions):
+        self.questions = questions
+        # Questions without an explicit id are addressed by their position
+        self.answer_key = {
+            str(question.get('id', index)): question['correct_answer']
+            for index, question in enumerate(questions)
+        }
+        self.total_questions = len(questions)
+
+    @staticmethod
+    def from_json(raw):
+        """Parse and validate a quiz JSON string, dropping malformed questions"""
+        try:
+            parsed = json.loads(raw) if raw else []
+        except (TypeError, json.JSONDecodeError):
+            parsed = []
+        if not isinstance(parsed, list):
+            parsed = []
+        questions = [
+            question for question in parsed
+            if isinstance(question, dict) and 'question' in question and 'correct_answer' in question
+        ]
+        return CompiledQuiz(questions)
+
+    def grade(self, answers):
+        """Count correct answers in a {question_id: answer} mapping"""
+        return sum(
+            1 for question_id, correct_answer in self.answer_key.items()
+            if question_id in answers and answers[question_id] == correct_answer
+        )
+
+
+class QuizCache:
+    """Size-bounded, thread-safe LRU of compiled quizzes keyed by module and content hash"""
+
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self.entries = OrderedDict()  # module_id -> (content_hash, CompiledQuiz)
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def content_hash(raw):
+        return hashlib.sha1((raw or '').encode('utf-8')).hexdigest()
+
+    def get(self, module_id, raw):
+        """Return the compiled quiz for this module version, compiling it on a miss"""
+        digest = self.content_hash(raw)
+        with self.lock:
+            entry = self.entries.get(module_id)
+            if entry and entry[0] == digest:
+                self.entries.move_to_end(module_id)
+                return entry[1]
+
+        compiled = CompiledQuiz.from_json(raw)
+
+        with self.lock:
+            self.entries[module_id] = (digest, compiled)
+            self.entries.move_to_end(module_id)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+        return compiled
+
+    def invalidate(self, module_id=None):
+        """Drop one module's entry, or everything when module_id is None"""
+        with self.lock:
+            if module_id is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(module_id, None)
+
+
+# Global quiz cache instance
+quiz_cache = QuizCache(max_size=int(os.getenv('QUIZ_CACHE_SIZE', '256')))
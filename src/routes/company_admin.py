@@ -1,10 +1,16 @@
-from flask import Blueprint, request, jsonify, session
-from src.models.database import db, Company, Employee, TrainingModule, EmployeeProgress, EmployeeNotes
+from flask import Blueprint, request, jsonify, session, current_app
+from src.models.database import db, Company, Employee, TrainingModule, EmployeeProgress, EmployeeNotes, ImportJob, ModuleCompanyStats
 from src.utils.security import SecurityValidator, RateLimiter, PasswordSecurity, AuditLogger
 from src.utils.email_service import email_service
+from src.utils.reports import CompanyProgressReport, EmployeeProgressListing
+from src.utils.bulk_operations import bulk_assign_training, chunked, EmployeeCsvImporter
+from src.utils.training_stats import TrainingStats
+from src.utils.http_cache import module_catalogue
 from datetime import datetime, timedelta
+import os
 import secrets
 import string
+import tempfile
 
 company_admin_bp = Blueprint('company_admin', __name__)
 
@@ -86,43 +92,31 @@ def get_company_dashboard(company_id):
         # Get statistics
         total_employees = Employee.query.filter_by(company_id=company_id).count()
         
-        # Get assigned modules count
-        assigned_modules = db.session.query(EmployeeProgress.module_id).filter(
-            EmployeeProgress.employee_id.in_(
-                db.session.query(Employee.id).filter_by(company_id=company_id)
-            )
-        ).distinct().count()
-        
-        # Get completed trainings
-        completed_trainings = EmployeeProgress.query.filter(
-            EmployeeProgress.employee_id.in_(
-                db.session.query(Employee.id).filter_by(company_id=company_id)
-            ),
-            EmployeeProgress.is_completed == True
+        # Get assigned modules, completed trainings and total progress records from the rollups
+        assigned_modules = ModuleCompanyStats.query.filter(
+            ModuleCompanyStats.company_id == company_id,
+            ModuleCompanyStats.assigned_count > 0
         ).count()
+        total_progress_records, completed_trainings = TrainingStats.company_totals(company_id)
         
         # Calculate completion rate
-        total_progress_records = EmployeeProgress.query.filter(
-            EmployeeProgress.employee_id.in_(
-                db.session.query(Employee.id).filter_by(company_id=company_id)
-            )
-        ).count()
-        
         completion_rate = 0
         if total_progress_records > 0:
             completion_rate = round((completed_trainings / total_progress_records) * 100, 1)
         
         # Get recent activity (last 10 activities)
         recent_activity = []
-        recent_progress = EmployeeProgress.query.filter(
+        recent_progress = EmployeeProgress.query.options(
+            *EmployeeProgress.load_related('employee', 'module')
+        ).filter(
             EmployeeProgress.employee_id.in_(
                 db.session.query(Employee.id).filter_by(company_id=company_id)
             )
         ).order_by(EmployeeProgress.started_date.desc()).limit(10).all()
         
         for progress in recent_progress:
-            employee = Employee.query.get(progress.employee_id)
-            module = TrainingModule.query.get(progress.module_id)
+            employee = progress.employee
+            module = progress.module
             if employee and module:
                 if progress.is_completed:
                     description = f"{employee.name} completed {module.title}"
@@ -163,46 +157,32 @@ def get_company_employees(company_id):
         
         search = request.args.get('search', '')
         department = request.args.get('department', '')
-        
-        query = Employee.query.filter_by(company_id=company_id)
-        
-        if search:
-            query = query.filter(
-                db.or_(
-                    Employee.name.ilike(f'%{search}%'),
-                    Employee.email.ilike(f'%{search}%')
-                )
+        sort = request.args.get('sort', 'id')  # id, completion_rate
+        order = request.args.get('order', 'asc')  # asc, desc
+        cursor = request.args.get('cursor')
+        limit = request.args.get('limit', type=int)
+        
+        if limit is not None:
+            limit = max(1, min(limit, 500))
+        
+        # Assigned/completed counts for every employee come from one grouped join
+        try:
+            employee_list, next_cursor = EmployeeProgressListing.fetch(
+                company_id,
+                search=search,
+                department=department,
+                sort=sort,
+                order=order,
+                cursor=cursor,
+                limit=limit
             )
-        
-        if department:
-            query = query.filter(Employee.department == department)
-        
-        employees = query.all()
-        
-        # Calculate training progress for each employee
-        employee_list = []
-        for employee in employees:
-            # Get employee's progress
-            total_assigned = EmployeeProgress.query.filter_by(employee_id=employee.id).count()
-            completed = EmployeeProgress.query.filter_by(employee_id=employee.id, is_completed=True).count()
-            
-            progress_percentage = 0
-            if total_assigned > 0:
-                progress_percentage = round((completed / total_assigned) * 100, 1)
-            
-            employee_list.append({
-                'id': employee.id,
-                'name': employee.name,
-                'email': employee.email,
-                'department': employee.department,
-                'position': employee.position,
-                'training_progress': progress_percentage,
-                'created_date': employee.created_date.isoformat() if employee.created_date else None
-            })
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
         
         return jsonify({
             'success': True,
-            'employees': employee_list
+            'employees': employee_list,
+            'next_cursor': next_cursor
         })
         
     except Exception as e:
@@ -301,7 +281,8 @@ def delete_employee(company_id, employee_id):
         if not employee:
             return jsonify({'success': False, 'message': 'Employee not found'}), 404
         
-        # Delete related progress records first
+        # Remove the employee's progress from the rollups, then delete the records
+        TrainingStats.record_employee_removal(employee_id)
         EmployeeProgress.query.filter_by(employee_id=employee_id).delete()
         
         # Delete employee
@@ -330,78 +311,59 @@ def bulk_import_employees(company_id):
         if not file.filename.endswith('.csv'):
             return jsonify({'success': False, 'message': 'File must be a CSV'}), 400
         
-        # Read CSV
-        stream = io.StringIO(file.stream.read().decode("UTF8"), newline=None)
-        csv_input = csv.DictReader(stream)
+        # Spool the upload to disk; werkzeug copies it in blocks rather than into memory
+        fd, path = tempfile.mkstemp(prefix='employee-import-', suffix='.csv')
+        os.close(fd)
+        file.save(path)
         
-        imported_count = 0
-        errors = []
-        
-        for row_num, row in enumerate(csv_input, start=2):  # Start at 2 because row 1 is headers
-            try:
-                # Validate required fields
-                if not all([row.get('name'), row.get('email')]):
-                    errors.append(f"Row {row_num}: Missing required fields")
-                    continue
-                
-                # Check if email already exists
-                if Employee.query.filter_by(email=row['email']).first():
-                    errors.append(f"Row {row_num}: Email {row['email']} already exists")
-                    continue
-                
-                # Generate password
-                password = ''.join(secrets.choice(string.ascii_letters + string.digits) for _ in range(8))
-                
-                # Create employee
-                employee = Employee(
-                    company_id=company_id,
-                    name=row['name'],
-                    email=row['email'],
-                    department=row.get('department'),
-                    employee_id=row.get('employee_id'),
-                    password=PasswordSecurity.hash_password(password)
-                )
-                
-                db.session.add(employee)
-                imported_count += 1
-                
-            except Exception as e:
-                errors.append(f"Row {row_num}: {str(e)}")
+        job = ImportJob(company_id=company_id, filename=file.filename, status='queued')
+        db.session.add(job)
+        db.session.commit()
         
-        if imported_count > 0:
-            db.session.commit()
+        # Parse, hash and insert in chunks on a background thread
+        EmployeeCsvImporter(current_app._get_current_object(), job.id, company_id, path).start()
         
         return jsonify({
             'success': True,
-            'imported_count': imported_count,
-            'errors': errors
-        })
+            'job_id': job.id,
+            'status': job.status,
+            'status_url': f'/api/company/{company_id}/employees/bulk-import/{job.id}'
+        }), 202
         
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'message': str(e)}), 500
 
-@company_admin_bp.route('/<int:company_id>/training-modules', methods=['GET'])
-def get_company_training_modules(company_id):
+@company_admin_bp.route('/<int:company_id>/employees/bulk-import/<int:job_id>', methods=['GET'])
+def get_bulk_import_status(company_id, job_id):
     try:
         if not require_company_admin_auth(company_id):
             return jsonify({'success': False, 'message': 'Authentication required'}), 401
         
-        modules = TrainingModule.query.all()
-        
-        module_list = []
-        for module in modules:
-            module_list.append({
-                'id': module.id,
-                'title': module.title,
-                'description': module.description,
-                'duration_minutes': module.duration_minutes,
-                'difficulty_level': module.difficulty_level
-            })
+        job = ImportJob.query.filter_by(id=job_id, company_id=company_id).first()
+        if not job:
+            return jsonify({'success': False, 'message': 'Import job not found'}), 404
         
         return jsonify({
             'success': True,
-            'modules': module_list
+            'job': job.to_dict()
+        })
+        
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+@company_admin_bp.route('/<int:company_id>/training-modules', methods=['GET'])
+def get_company_training_modules(company_id):
+    try:
+        if not require_company_admin_auth(company_id):
+            return jsonify({'success': False, 'message': 'Authentication required'}), 401
+        
+        return module_catalogue.response('company', lambda module: {
+            'id': module.id,
+            'title': module.title,
+            'description': module.description,
+            'duration_minutes': module.duration_minutes,
+            'difficulty_level': module.difficulty_level
         })
         
     except Exception as e:
@@ -420,46 +382,36 @@ def assign_training(company_id):
         if not employee_ids or not module_ids:
             return jsonify({'success': False, 'message': 'Employee IDs and Module IDs are required'}), 400
         
-        # Verify employees belong to this company
-        employees = Employee.query.filter(
-            Employee.id.in_(employee_ids),
-            Employee.company_id == company_id
-        ).all()
+        employee_ids = list(dict.fromkeys(employee_ids))
+        module_ids = list(dict.fromkeys(module_ids))
         
-        if len(employees) != len(employee_ids):
+        # Verify employees belong to this company
+        found_employees = 0
+        for employee_chunk in chunked(employee_ids):
+            found_employees += db.session.query(db.func.count(Employee.id)).filter(
+                Employee.id.in_(employee_chunk),
+                Employee.company_id == company_id
+            ).scalar()
+        
+        if found_employees != len(employee_ids):
             return jsonify({'success': False, 'message': 'Some employees not found or not in this company'}), 400
         
         # Verify modules exist
-        modules = TrainingModule.query.filter(TrainingModule.id.in_(module_ids)).all()
-        if len(modules) != len(module_ids):
+        found_modules = db.session.query(db.func.count(TrainingModule.id)).filter(
+            TrainingModule.id.in_(module_ids)
+        ).scalar()
+        if found_modules != len(module_ids):
             return jsonify({'success': False, 'message': 'Some training modules not found'}), 400
         
-        # Create progress records
-        assignments_created = 0
-        for employee_id in employee_ids:
-            for module_id in module_ids:
-                # Check if assignment already exists
-                existing = EmployeeProgress.query.filter_by(
-                    employee_id=employee_id,
-                    module_id=module_id
-                ).first()
-                
-                if not existing:
-                    progress = EmployeeProgress(
-                        employee_id=employee_id,
-                        module_id=module_id,
-                        progress_percentage=0,
-                        completed=False,
-                        assigned_date=datetime.utcnow()
-                    )
-                    db.session.add(progress)
-                    assignments_created += 1
+        # Create missing progress records with one set-based insert
+        assignments_created, assignments_skipped = bulk_assign_training(company_id, employee_ids, module_ids)
         
         db.session.commit()
         
         return jsonify({
             'success': True,
-            'assignments_created': assignments_created
+            'assignments_created': assignments_created,
+            'assignments_skipped': assignments_skipped
         })
         
     except Exception as e:
@@ -472,110 +424,12 @@ def get_company_progress_report(company_id):
         if not require_company_admin_auth(company_id):
             return jsonify({'success': False, 'message': 'Authentication required'}), 401
         
-        # Get overall completion rate
-        total_progress = EmployeeProgress.query.filter(
-            EmployeeProgress.employee_id.in_(
-                db.session.query(Employee.id).filter_by(company_id=company_id)
-            )
-        ).count()
-        
-        completed_progress = EmployeeProgress.query.filter(
-            EmployeeProgress.employee_id.in_(
-                db.session.query(Employee.id).filter_by(company_id=company_id)
-            ),
-            EmployeeProgress.is_completed == True
-        ).count()
-        
-        overall_completion_rate = 0
-        if total_progress > 0:
-            overall_completion_rate = round((completed_progress / total_progress) * 100, 1)
-        
-        # Calculate average completion time (placeholder)
-        average_completion_time = "2.5 hours"
-        
-        # Count top performers (employees with 100% completion)
-        top_performers = db.session.query(Employee.id).filter(
-            Employee.company_id == company_id,
-            Employee.id.in_(
-                db.session.query(EmployeeProgress.employee_id).filter(
-                    EmployeeProgress.is_completed == True
-                ).group_by(EmployeeProgress.employee_id).having(
-                    db.func.count(EmployeeProgress.id) == db.session.query(
-                        db.func.count(EmployeeProgress.id)
-                    ).filter(EmployeeProgress.employee_id == Employee.id).scalar_subquery()
-                )
-            )
-        ).count()
-        
-        # Get module progress
-        module_progress = []
-        modules = TrainingModule.query.all()
-        
-        for module in modules:
-            assigned_count = EmployeeProgress.query.filter(
-                EmployeeProgress.module_id == module.id,
-                EmployeeProgress.employee_id.in_(
-                    db.session.query(Employee.id).filter_by(company_id=company_id)
-                )
-            ).count()
-            
-            completed_count = EmployeeProgress.query.filter(
-                EmployeeProgress.module_id == module.id,
-                EmployeeProgress.employee_id.in_(
-                    db.session.query(Employee.id).filter_by(company_id=company_id)
-                ),
-                EmployeeProgress.is_completed == True
-            ).count()
-            
-            completion_rate = 0
-            if assigned_count > 0:
-                completion_rate = round((completed_count / assigned_count) * 100, 1)
-            
-            if assigned_count > 0:  # Only include modules that have been assigned
-                module_progress.append({
-                    'title': module.title,
-                    'assigned_count': assigned_count,
-                    'completed_count': completed_count,
-                    'completion_rate': completion_rate
-                })
-        
-        # Get employee progress
-        employee_progress = []
-        employees = Employee.query.filter_by(company_id=company_id).all()
-        
-        for employee in employees:
-            assigned_modules = EmployeeProgress.query.filter_by(employee_id=employee.id).count()
-            completed_modules = EmployeeProgress.query.filter_by(employee_id=employee.id, is_completed=True).count()
-            
-            completion_rate = 0
-            if assigned_modules > 0:
-                completion_rate = round((completed_modules / assigned_modules) * 100, 1)
-            
-            # Get last activity
-            last_progress = EmployeeProgress.query.filter_by(employee_id=employee.id).order_by(
-                EmployeeProgress.started_date.desc()
-            ).first()
-            
-            last_activity = None
-            if last_progress and last_progress.started_date:
-                last_activity = last_progress.started_date.isoformat()
-            
-            if assigned_modules > 0:  # Only include employees with assigned training
-                employee_progress.append({
-                    'name': employee.name,
-                    'assigned_modules': assigned_modules,
-                    'completed_modules': completed_modules,
-                    'completion_rate': completion_rate,
-                    'last_activity': last_activity
-                })
+        # Whole report comes from a fixed number of grouped aggregates
+        report = CompanyProgressReport.build(company_id)
         
         return jsonify({
             'success': True,
-            'overall_completion_rate': overall_completion_rate,
-            'average_completion_time': average_completion_time,
-            'top_performers': top_performers,
-            'module_progress': module_progress,
-            'employee_progress': employee_progress
+            **report
         })
         
     except Exception as e:
@@ -714,11 +568,11 @@ def bulk_reset_employee_passwords(company_id):
         
         reset_results = []
         
-        for employee in employees:
-            # Generate new password for each employee
-            new_password = PasswordSecurity.generate_secure_password(length=8)
-            hashed_password = PasswordSecurity.hash_password(new_password)
-            
+        # Generate new password for each employee and hash them as one batch
+        new_passwords = [PasswordSecurity.generate_secure_password(length=8) for _ in employees]
+        hashed_passwords = PasswordSecurity.hash_passwords(new_passwords)
+        
+        for employee, new_password, hashed_password in zip(employees, new_passwords, hashed_passwords):
             employee.password = hashed_password
             employee.updated_at = datetime.now()
             
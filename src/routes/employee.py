@@ -1,6 +1,12 @@
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, request, jsonify, session, send_file, current_app
 from src.models.database import db, Employee, Company, TrainingModule, EmployeeProgress, EmployeeNotes
 from src.utils.security import PasswordSecurity
+from src.utils.training_stats import TrainingStats
+from src.utils.progress_tracking import apply_progress_update, load_progress_for_update, progress_buffer
+from src.utils.http_cache import module_catalogue
+from src.utils.reports import EmployeeDashboard
+from src.utils.certificates import CertificateStore, certificate_store
+from src.utils.media import video_library
 from datetime import datetime
 import json
 
@@ -109,35 +115,7 @@ def update_employee_progress(employee_id, module_id):
             return jsonify({'error': 'Authentication required'}), 401
         
         data = request.get_json()
-        
-        # Find or create progress record
-        progress = EmployeeProgress.query.filter_by(
-            employee_id=employee_id, 
-            module_id=module_id
-        ).first()
-        
-        if not progress:
-            progress = EmployeeProgress(
-                employee_id=employee_id,
-                module_id=module_id,
-                progress=0,
-                completed=False
-            )
-            db.session.add(progress)
-        
-        # Update progress
-        if 'progress' in data:
-            progress.progress = data['progress']
-            if progress.progress >= 100:
-                progress.is_completed = True
-                progress.completed_at = datetime.utcnow()
-        
-        if 'completed' in data:
-            progress.is_completed = data['completed']
-            if progress.is_completed and not progress.completed_at:
-                progress.completed_at = datetime.utcnow()
-        
-        db.session.commit()
+        progress = apply_progress_update(employee_id, module_id, data)
         
         return jsonify({
             'success': True,
@@ -149,6 +127,47 @@ def update_employee_progress(employee_id, module_id):
         db.session.rollback()
         return jsonify({'error': 'Failed to update progress'}), 500
 
+@employee_bp.route('/<int:employee_id>/progress/heartbeat', methods=['POST'])
+def progress_heartbeat(employee_id):
+    """Accept coalesced playback positions; completions are written immediately"""
+    try:
+        if not require_employee_auth(employee_id):
+            return jsonify({'error': 'Authentication required'}), 401
+        
+        data = request.get_json() or {}
+        updates = data.get('updates')
+        if not isinstance(updates, list) or len(updates) > 100:
+            return jsonify({'error': 'updates must be a list of at most 100 items'}), 400
+        
+        buffered = completed = 0
+        for update in updates:
+            try:
+                module_id = int(update['module_id'])
+                last_position = int(update.get('last_position') or 0)
+            except (KeyError, TypeError, ValueError):
+                return jsonify({'error': 'Each update needs a numeric module_id and last_position'}), 400
+            
+            if update.get('completed') or (update.get('progress') or 0) >= 100:
+                apply_progress_update(employee_id, module_id, update)
+                completed += 1
+            else:
+                progress_buffer.record(employee_id, module_id, last_position)
+                buffered += 1
+        
+        # Without a background flusher, write through
+        if buffered and 'progress_flusher' not in current_app.extensions:
+            progress_buffer.flush()
+        
+        return jsonify({
+            'success': True,
+            'buffered': buffered,
+            'completed': completed
+        }), 202
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to record progress'}), 500
+
 @employee_bp.route('/<int:employee_id>/notes/<int:module_id>', methods=['POST'])
 def save_employee_notes(employee_id, module_id):
     """Save employee notes for a module"""
@@ -214,12 +233,8 @@ def get_training_modules(employee_id):
         if not require_employee_auth(employee_id):
             return jsonify({'error': 'Authentication required'}), 401
         
-        modules = TrainingModule.query.all()
-        
-        return jsonify({
-            'success': True,
-            'modules': [module.to_dict() for module in modules]
-        })
+        # Same payload for every employee; served from the versioned catalogue cache
+        return module_catalogue.response('full', lambda module: module.to_dict())
         
     except Exception as e:
         return jsonify({'error': 'Failed to get modules'}), 500
@@ -243,6 +258,24 @@ def get_training_module(employee_id, module_id):
     except Exception as e:
         return jsonify({'error': 'Failed to get module'}), 500
 
+@employee_bp.route('/<int:employee_id>/modules/<int:module_id>/video', methods=['GET'])
+def stream_training_video(employee_id, module_id):
+    """Stream a module's training video (supports Range and conditional requests)"""
+    try:
+        if not require_employee_auth(employee_id):
+            return jsonify({'error': 'Authentication required'}), 401
+        
+        path = video_library.authorized_path(employee_id, module_id)
+        if not path:
+            return jsonify({'error': 'Video not found'}), 404
+        
+        return video_library.send(path)
+        
+    except FileNotFoundError:
+        return jsonify({'error': 'Video not found'}), 404
+    except Exception as e:
+        return jsonify({'error': 'Failed to stream video'}), 500
+
 @employee_bp.route('/<int:employee_id>/quiz/<int:module_id>', methods=['POST'])
 def submit_quiz(employee_id, module_id):
     """Submit quiz answers and calculate score"""
@@ -258,43 +291,32 @@ def submit_quiz(employee_id, module_id):
         if not module or not module.quiz_questions:
             return jsonify({'error': 'Quiz not found'}), 404
         
-        quiz_questions = json.loads(module.quiz_questions)
-        total_questions = len(quiz_questions)
-        correct_answers = 0
-        
-        # Calculate score
-        for question in quiz_questions:
-            question_id = str(question['id'])
-            if question_id in answers:
-                if answers[question_id] == question['correct_answer']:
-                    correct_answers += 1
+        # Calculate score against the cached answer key
+        quiz = module.get_compiled_quiz()
+        total_questions = quiz.total_questions
+        correct_answers = quiz.grade(answers)
         
         score = (correct_answers / total_questions) * 100 if total_questions > 0 else 0
         passed = score >= 80  # 80% passing score
         
-        # Update progress
-        progress = EmployeeProgress.query.filter_by(
-            employee_id=employee_id,
-            module_id=module_id
-        ).first()
-        
-        if not progress:
-            progress = EmployeeProgress(
-                employee_id=employee_id,
-                module_id=module_id,
-                progress=0,
-                completed=False
-            )
-            db.session.add(progress)
+        # Update progress (row locked so the completion is counted once)
+        progress, assigned_delta = load_progress_for_update(employee_id, module_id)
+        was_completed = bool(progress.is_completed)
         
         # Update quiz results
-        progress.quiz_score = score
-        progress.quiz_attempts = (progress.quiz_attempts or 0) + 1
+        progress.score = score
+        progress.attempts = (progress.attempts or 0) + 1
         
         if passed:
             progress.is_completed = True
-            progress.progress = 100
-            progress.completed_at = datetime.utcnow()
+            progress.completed_date = progress.completed_date or datetime.utcnow()
+        
+        # Keep the precomputed statistics in the same transaction
+        TrainingStats.record(
+            TrainingStats.company_id_for_employee(employee_id), module_id,
+            assigned=assigned_delta,
+            completed=int(bool(progress.is_completed)) - int(was_completed)
+        )
         
         db.session.commit()
         
@@ -318,21 +340,23 @@ def get_certificates(employee_id):
         if not require_employee_auth(employee_id):
             return jsonify({'error': 'Authentication required'}), 401
         
-        # Get completed modules
-        completed_progress = EmployeeProgress.query.filter_by(
+        # Get completed modules, with their modules loaded in the same query
+        completed_progress = EmployeeProgress.query.options(
+            *EmployeeProgress.load_related('module')
+        ).filter_by(
             employee_id=employee_id,
-            completed=True
-        ).all()
+            is_completed=True
+        ).order_by(EmployeeProgress.completed_date).all()
         
         certificates = []
         for progress in completed_progress:
-            module = TrainingModule.query.get(progress.module_id)
+            module = progress.module
             if module:
                 certificates.append({
                     'module_id': module.id,
                     'module_title': module.title,
-                    'completed_at': progress.completed_at.isoformat() if progress.completed_at else None,
-                    'score': progress.quiz_score,
+                    'completed_at': progress.completed_date.isoformat() if progress.completed_date else None,
+                    'score': progress.score,
                     'certificate_url': f'/api/employee/{employee_id}/certificate/{module.id}'
                 })
         
@@ -355,31 +379,39 @@ def download_certificate(employee_id, module_id):
         progress = EmployeeProgress.query.filter_by(
             employee_id=employee_id,
             module_id=module_id,
-            completed=True
+            is_completed=True
         ).first()
         
         if not progress:
             return jsonify({'error': 'Module not completed'}), 404
         
-        employee = Employee.query.get(employee_id)
-        module = TrainingModule.query.get(module_id)
+        employee = db.session.get(Employee, employee_id)
+        module = db.session.get(TrainingModule, module_id)
         
         if not employee or not module:
             return jsonify({'error': 'Employee or module not found'}), 404
         
-        # Generate certificate (simplified - in real implementation, generate PDF)
-        certificate_data = {
-            'employee_name': employee.name,
-            'module_title': module.title,
-            'completed_at': progress.completed_at.isoformat() if progress.completed_at else None,
-            'score': progress.quiz_score,
-            'certificate_id': f'CERT-{employee_id}-{module_id}-{progress.completed_at.strftime("%Y%m%d") if progress.completed_at else "unknown"}'
-        }
-        
-        return jsonify({
-            'success': True,
-            'certificate': certificate_data
-        })
+        certificate_data = CertificateStore.certificate_data(
+            employee, module, progress, employee.company.name if employee.company else None
+        )
+        
+        if request.args.get('format') == 'json':
+            return jsonify({
+                'success': True,
+                'certificate': certificate_data
+            })
+        
+        # Rendered once, then served from the content-addressed cache
+        path, key = certificate_store.get_or_render(certificate_data)
+        return send_file(
+            path,
+            mimetype='application/pdf',
+            as_attachment=True,
+            download_name=f"{certificate_data['certificate_id']}.pdf",
+            conditional=True,
+            etag=key,
+            max_age=3600
+        )
         
     except Exception as e:
         return jsonify({'error': 'Failed to generate certificate'}), 500
@@ -391,6 +423,23 @@ def get_dashboard_data(employee_id):
         if not require_employee_auth(employee_id):
             return jsonify({'error': 'Authentication required'}), 401
         
+        # Lean mode: projected columns, SQL statistics, no quiz payloads
+        fields = request.args.get('fields')
+        if fields is not None or request.args.get('mode') == 'lean':
+            try:
+                sections = EmployeeDashboard.parse_fields(fields)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            
+            dashboard_data = EmployeeDashboard.build(employee_id, sections)
+            if dashboard_data is None:
+                return jsonify({'error': 'Employee not found'}), 404
+            
+            return jsonify({
+                'success': True,
+                'dashboard': dashboard_data
+            })
+        
         employee = Employee.query.get(employee_id)
         if not employee:
             return jsonify({'error': 'Employee not found'}), 404
@@ -402,7 +451,7 @@ def get_dashboard_data(employee_id):
         # Calculate statistics
         completed_modules = len([p for p in progress if p.is_completed])
         total_modules = len(modules)
-        in_progress_modules = len([p for p in progress if not p.is_completed and p.progress > 0])
+        in_progress_modules = len([p for p in progress if not p.is_completed and (p.last_position or 0) > 0])
         
         # Get recent activity
         recent_progress = sorted(
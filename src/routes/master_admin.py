@@ -1,7 +1,11 @@
-from flask import Blueprint, request, jsonify, session
-from src.models.database import db, Company, Employee, TrainingModule, EmployeeProgress
+from flask import Blueprint, request, jsonify, session, current_app
+from src.models.database import db, Company, TrainingModule, OutboundEmail, ReminderCampaign
+from src.models.engine import pool_metrics
 from src.utils.security import SecurityValidator, RateLimiter, PasswordSecurity, AuditLogger, rate_limit
 from src.utils.email_service import email_service
+from src.utils.email_queue import EmailQueueWorker
+from src.utils.reminder_campaigns import ReminderCampaignRunner
+from src.utils.reports import CompanyListing, MasterReports, master_report_cache
 import string
 import secrets
 from datetime import datetime
@@ -75,17 +79,7 @@ def dashboard():
     if not require_master_admin_auth():
         return jsonify({'error': 'Authentication required'}), 401
     
-    total_companies = Company.query.count()
-    active_companies = Company.query.filter_by(is_active=True).count()
-    total_employees = Employee.query.count()
-    active_modules = TrainingModule.query.filter_by(is_active=True).count()
-    
-    return jsonify({
-        'total_companies': total_companies,
-        'active_companies': active_companies,
-        'total_employees': total_employees,
-        'active_modules': active_modules
-    })
+    return jsonify(master_report_cache.get_or_compute('dashboard', MasterReports.dashboard_counts))
 
 @master_admin_bp.route('/companies', methods=['GET'])
 def get_companies():
@@ -93,29 +87,26 @@ def get_companies():
     if not require_master_admin_auth():
         return jsonify({'error': 'Authentication required'}), 401
     
-    search = request.args.get('search', '')
+    search = request.args.get('search', '').strip()
     status = request.args.get('status', 'all')  # all, active, inactive
+    cursor = request.args.get('cursor')
+    limit = request.args.get('limit', type=int)
     
-    query = Company.query
-    
-    if search:
-        query = query.filter(Company.name.contains(search))
-    
-    if status == 'active':
-        query = query.filter_by(is_active=True)
-    elif status == 'inactive':
-        query = query.filter_by(is_active=False)
-    
-    companies = query.all()
+    if limit is not None:
+        limit = max(1, min(limit, 500))
     
-    companies_data = []
-    for company in companies:
-        company_dict = company.to_dict()
-        # Add employee count for this company
-        company_dict['actual_employee_count'] = Employee.query.filter_by(company_id=company.id).count()
-        companies_data.append(company_dict)
+    # Headcounts for every company come from one grouped outer join
+    try:
+        companies_data, next_cursor = CompanyListing.fetch(
+            search=search,
+            status=status,
+            cursor=cursor,
+            limit=limit
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    return jsonify({'companies': companies_data})
+    return jsonify({'companies': companies_data, 'next_cursor': next_cursor})
 
 @master_admin_bp.route('/companies', methods=['POST'])
 def create_company():
@@ -149,6 +140,7 @@ def create_company():
     try:
         db.session.add(company)
         db.session.commit()
+        master_report_cache.invalidate()
         
         # Return company data with plain text password for email
         company_dict = company.to_dict()
@@ -186,6 +178,7 @@ def update_company(company_id):
     
     try:
         db.session.commit()
+        master_report_cache.invalidate()
         return jsonify({
             'success': True,
             'message': 'Company updated successfully',
@@ -206,6 +199,7 @@ def delete_company(company_id):
     
     try:
         db.session.commit()
+        master_report_cache.invalidate()
         return jsonify({
             'success': True,
             'message': 'Company deactivated successfully'
@@ -237,6 +231,7 @@ def bulk_company_action():
     
     try:
         db.session.commit()
+        master_report_cache.invalidate()
         return jsonify({
             'success': True,
             'message': f'Bulk {action} completed successfully',
@@ -261,32 +256,78 @@ def get_overview_report():
     if not require_master_admin_auth():
         return jsonify({'error': 'Authentication required'}), 401
     
-    # Calculate completion rates
-    total_progress = EmployeeProgress.query.count()
-    completed_progress = EmployeeProgress.query.filter_by(is_completed=True).count()
-    completion_rate = (completed_progress / total_progress * 100) if total_progress > 0 else 0
-    
-    # Get module completion stats
-    module_stats = []
-    modules = TrainingModule.query.filter_by(is_active=True).all()
-    for module in modules:
-        total_attempts = EmployeeProgress.query.filter_by(module_id=module.id).count()
-        completed_attempts = EmployeeProgress.query.filter_by(module_id=module.id, is_completed=True).count()
-        module_completion_rate = (completed_attempts / total_attempts * 100) if total_attempts > 0 else 0
-        
-        module_stats.append({
-            'module_name': module.title,
-            'total_attempts': total_attempts,
-            'completed_attempts': completed_attempts,
-            'completion_rate': round(module_completion_rate, 2)
-        })
+    return jsonify(master_report_cache.get_or_compute('overview', MasterReports.overview))
+
+@master_admin_bp.route('/metrics/db-pool', methods=['GET'])
+def get_db_pool_metrics():
+    """Get connection pool state and checkout wait statistics for this worker"""
+    if not require_master_admin_auth():
+        return jsonify({'error': 'Authentication required'}), 401
     
-    return jsonify({
-        'overall_completion_rate': round(completion_rate, 2),
-        'total_progress_records': total_progress,
-        'completed_records': completed_progress,
-        'module_stats': module_stats
-    })
+    return jsonify({'pool': pool_metrics.snapshot(db.engine)})
+
+@master_admin_bp.route('/email-queue', methods=['GET'])
+def get_email_queue_status():
+    """Get outbound email queue counts by delivery status"""
+    if not require_master_admin_auth():
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    return jsonify({'status_counts': EmailQueueWorker.delivery_summary()})
+
+@master_admin_bp.route('/email-queue/<int:message_id>', methods=['GET'])
+def get_email_delivery_status(message_id):
+    """Get delivery status of one queued email"""
+    if not require_master_admin_auth():
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    message = OutboundEmail.query.get_or_404(message_id)
+    return jsonify({'email': message.to_dict()})
+
+@master_admin_bp.route('/reminder-campaigns', methods=['POST'])
+def start_reminder_campaign():
+    """Start a reminder campaign for overdue training"""
+    if not require_master_admin_auth():
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    data = request.get_json() or {}
+    try:
+        campaign = ReminderCampaignRunner.create(
+            company_ids=data.get('company_ids'),
+            due_days=int(data.get('due_days', 14)),
+            rate_per_second=float(data.get('rate_per_second', 5))
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    
+    runner = ReminderCampaignRunner(current_app._get_current_object(), campaign.id)
+    runner.claim()
+    runner.start()
+    return jsonify({'success': True, 'campaign': campaign.to_dict()}), 202
+
+@master_admin_bp.route('/reminder-campaigns/<int:campaign_id>', methods=['GET'])
+def get_reminder_campaign(campaign_id):
+    """Get reminder campaign progress"""
+    if not require_master_admin_auth():
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    campaign = ReminderCampaign.query.get_or_404(campaign_id)
+    return jsonify({'campaign': campaign.to_dict()})
+
+@master_admin_bp.route('/reminder-campaigns/<int:campaign_id>/resume', methods=['POST'])
+def resume_reminder_campaign(campaign_id):
+    """Resume an interrupted reminder campaign from its checkpoint"""
+    if not require_master_admin_auth():
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    campaign = ReminderCampaign.query.get_or_404(campaign_id)
+    if campaign.status == 'completed':
+        return jsonify({'error': 'Campaign already completed'}), 400
+    
+    runner = ReminderCampaignRunner(current_app._get_current_object(), campaign.id)
+    if not runner.claim():
+        return jsonify({'error': 'Campaign is already running'}), 409
+    runner.start()
+    return jsonify({'success': True, 'campaign': campaign.to_dict()}), 202
 
 @master_admin_bp.route('/check-auth', methods=['GET'])
 def check_auth():
@@ -412,11 +453,11 @@ def bulk_reset_company_passwords():
     reset_results = []
     
     try:
-        for company in companies:
-            # Generate new password for each company
-            new_password = PasswordSecurity.generate_secure_password()
-            hashed_password = PasswordSecurity.hash_password(new_password)
-            
+        # Generate new password for each company and hash them as one batch
+        new_passwords = [PasswordSecurity.generate_secure_password() for _ in companies]
+        hashed_passwords = PasswordSecurity.hash_passwords(new_passwords)
+        
+        for company, new_password, hashed_password in zip(companies, new_passwords, hashed_passwords):
             company.admin_password = hashed_password
             company.updated_at = datetime.now()
             
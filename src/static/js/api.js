@@ -1,8 +1,123 @@
 // API handling for Starcomm Training System
 
+// Coalesces writes to the same resource: bursts are debounced to one request
+// carrying the latest payload, unsent writes are kept in localStorage and
+// replayed after a network drop or reload, and transient failures are retried
+// with jittered exponential backoff.
+class WriteCoalescer {
+    constructor(api, options = {}) {
+        this.api = api;
+        this.storageKey = options.storageKey || 'starcomm.pendingWrites';
+        this.maxWait = options.maxWait || 5000;       // flush a busy key at least this often
+        this.baseBackoff = options.baseBackoff || 1000;
+        this.maxBackoff = options.maxBackoff || 30000;
+        this.maxAttempts = options.maxAttempts || 8;
+        this.pending = new Map();  // key -> { method, url, data, timer, firstQueued, waiters }
+        this.inFlight = new Set();
+
+        window.addEventListener('online', () => this.replay());
+        window.addEventListener('pagehide', () => this.persist());
+        // Writes left over from a previous page load
+        setTimeout(() => this.replay(), 0);
+    }
+
+    // Queue a write; resolves with the server response once the latest payload for the key is sent,
+    // or with { success: true, queued: true } if it was parked for replay while offline
+    write(key, method, url, data, delay = 1000) {
+        const now = Date.now();
+        let entry = this.pending.get(key);
+        if (!entry) {
+            entry = { firstQueued: now, waiters: [], attempts: 0 };
+            this.pending.set(key, entry);
+        }
+        Object.assign(entry, { method, url, data });
+        clearTimeout(entry.timer);
+
+        const promise = new Promise((resolve, reject) => entry.waiters.push({ resolve, reject }));
+        const wait = Math.max(0, Math.min(delay, entry.firstQueued + this.maxWait - now));
+        entry.timer = setTimeout(() => this.send(key), wait);
+        this.persist();
+        return promise;
+    }
+
+    async send(key) {
+        const entry = this.pending.get(key);
+        if (!entry) return;
+        // One request per key at a time; a newer payload goes out after this one
+        if (this.inFlight.has(key)) {
+            entry.timer = setTimeout(() => this.send(key), 250);
+            return;
+        }
+        this.pending.delete(key);
+        this.inFlight.add(key);
+
+        try {
+            const response = await this.api.request(entry.method, entry.url, entry.data);
+            entry.waiters.forEach(waiter => waiter.resolve(response));
+        } catch (error) {
+            const transient = !error.status || error.status >= 500 || error.status === 429;
+            if (transient && entry.attempts + 1 < this.maxAttempts) {
+                this.retry(key, entry);
+                entry.waiters.forEach(waiter => waiter.resolve({ success: true, queued: true }));
+            } else {
+                entry.waiters.forEach(waiter => waiter.reject(error));
+            }
+        } finally {
+            this.inFlight.delete(key);
+            this.persist();
+        }
+    }
+
+    retry(key, entry) {
+        // A newer write for the same key supersedes this payload
+        if (this.pending.has(key)) return;
+        const attempts = entry.attempts + 1;
+        const retryEntry = { ...entry, attempts, waiters: [], firstQueued: Date.now() };
+        this.pending.set(key, retryEntry);
+        if (navigator.onLine === false) return;  // replayed by the 'online' handler
+        const ceiling = Math.min(this.maxBackoff, this.baseBackoff * 2 ** attempts);
+        retryEntry.timer = setTimeout(() => this.send(key), Math.random() * ceiling);
+    }
+
+    replay() {
+        let stored = {};
+        try {
+            stored = JSON.parse(localStorage.getItem(this.storageKey) || '{}');
+        } catch (error) {
+            stored = {};
+        }
+        Object.entries(stored).forEach(([key, write]) => {
+            if (!this.pending.has(key) && !this.inFlight.has(key)) {
+                this.pending.set(key, { ...write, waiters: [], firstQueued: Date.now() });
+            }
+        });
+        this.pending.forEach((entry, key) => {
+            clearTimeout(entry.timer);
+            entry.timer = setTimeout(() => this.send(key), Math.random() * this.baseBackoff);
+        });
+    }
+
+    persist() {
+        const stored = {};
+        this.pending.forEach((entry, key) => {
+            stored[key] = { method: entry.method, url: entry.url, data: entry.data, attempts: entry.attempts };
+        });
+        try {
+            if (Object.keys(stored).length) {
+                localStorage.setItem(this.storageKey, JSON.stringify(stored));
+            } else {
+                localStorage.removeItem(this.storageKey);
+            }
+        } catch (error) {
+            console.warn('Could not persist pending writes:', error);
+        }
+    }
+}
+
 class API {
     constructor() {
         this.baseURL = '';  // Relative URLs since frontend and backend are served together
+        this.writes = new WriteCoalescer(this);
     }
 
     // Generic request method
@@ -41,7 +156,9 @@ class API {
             }
 
             if (!response.ok) {
-                throw new Error(responseData.message || responseData.error || `HTTP ${response.status}`);
+                const error = new Error(responseData.message || responseData.error || `HTTP ${response.status}`);
+                error.status = response.status;
+                throw error;
             }
 
             return responseData;
@@ -84,10 +201,12 @@ class API {
         return this.get('/api/master/dashboard');
     }
 
-    async getCompanies(search = '', status = 'all') {
+    async getCompanies(search = '', status = 'all', cursor = null, limit = null) {
         const params = new URLSearchParams();
         if (search) params.append('search', search);
         if (status !== 'all') params.append('status', status);
+        if (cursor) params.append('cursor', cursor);
+        if (limit) params.append('limit', limit);
         
         const url = '/api/master/companies' + (params.toString() ? '?' + params.toString() : '');
         return this.get(url);
@@ -172,12 +291,34 @@ class API {
         return this.get(`/api/employee/${employeeId}/progress`);
     }
 
-    async updateEmployeeProgress(employeeId, moduleId, progressData) {
-        return this.put(`/api/employee/${employeeId}/progress/${moduleId}`, progressData);
+    // Coalesced per module; pass { immediate: true } for completions
+    async updateEmployeeProgress(employeeId, moduleId, progressData, options = {}) {
+        return this.writes.write(
+            `progress:${employeeId}:${moduleId}`, 'PUT',
+            `/api/employee/${employeeId}/progress/${moduleId}`, progressData,
+            options.immediate ? 0 : 1000
+        );
+    }
+
+    // Coalesced playback positions: [{ module_id, last_position, progress }]
+    async sendProgressHeartbeat(employeeId, updates, options = {}) {
+        const url = `/api/employee/${employeeId}/progress/heartbeat`;
+        // sendBeacon survives page unload
+        if (options.beacon && navigator.sendBeacon) {
+            const body = new Blob([JSON.stringify({ updates })], { type: 'application/json' });
+            if (navigator.sendBeacon(this.baseURL + url, body)) {
+                return { success: true };
+            }
+        }
+        const modules = updates.map(update => update.module_id).join(',');
+        return this.writes.write(`heartbeat:${employeeId}:${modules}`, 'POST', url, { updates }, 0);
     }
 
     async saveEmployeeNotes(employeeId, moduleId, notes) {
-        return this.post(`/api/employee/${employeeId}/notes/${moduleId}`, { notes });
+        return this.writes.write(
+            `notes:${employeeId}:${moduleId}`, 'POST',
+            `/api/employee/${employeeId}/notes/${moduleId}`, { notes }
+        );
     }
 
     async getEmployeeNotes(employeeId, moduleId) {
@@ -200,8 +341,26 @@ class API {
         return this.get(`/api/employee/${employeeId}/certificates`);
     }
 
+    // Local module videos stream through the access-checked media endpoint
+    videoUrl(employeeId, module) {
+        if (module.video_url && module.video_url.startsWith('/static/videos/')) {
+            return `${this.baseURL}/api/employee/${employeeId}/modules/${module.id}/video`;
+        }
+        return module.video_url;
+    }
+
+    certificateUrl(employeeId, moduleId) {
+        return `${this.baseURL}/api/employee/${employeeId}/certificate/${moduleId}`;
+    }
+
     async downloadCertificate(employeeId, moduleId) {
-        return this.get(`/api/employee/${employeeId}/certificate/${moduleId}`);
+        const response = await fetch(this.certificateUrl(employeeId, moduleId), { credentials: 'same-origin' });
+        if (!response.ok) {
+            const contentType = response.headers.get('content-type') || '';
+            const error = contentType.includes('application/json') ? await response.json() : {};
+            throw new Error(error.error || `HTTP ${response.status}`);
+        }
+        return response.blob();
     }
 
     async getEmployeeDashboard(employeeId) {
@@ -218,6 +377,21 @@ class API {
         return this.post(`/api/company/${companyId}/employees/bulk-import`, formData);
     }
 
+    async getBulkImportStatus(companyId, jobId) {
+        return this.get(`/api/company/${companyId}/employees/bulk-import/${jobId}`);
+    }
+
+    async waitForBulkImport(companyId, jobId, intervalMs = 1000) {
+        // Poll the background import job until it finishes
+        while (true) {
+            const result = await this.getBulkImportStatus(companyId, jobId);
+            if (!result.success || ['completed', 'failed'].includes(result.job.status)) {
+                return result;
+            }
+            await new Promise(resolve => setTimeout(resolve, intervalMs));
+        }
+    }
+
     async getCompanyTrainingModules(companyId) {
         return this.get(`/api/company/${companyId}/training-modules`);
     }
@@ -179,9 +179,7 @@ class App {
             window.auth = auth;
             window.api = api;
             window.router = router;
-            window.masterAdmin = masterAdmin;
-            window.companyAdmin = companyAdmin;
-            window.employee = employee;
+            // Role components (masterAdmin, companyAdmin, employee) become globals once the router loads their bundle
 
             console.log('Development mode: Global objects available in console');
         }
@@ -674,14 +674,15 @@ class CompanyAdmin {
 
         try {
             showLoading();
-            const result = await api.bulkImportEmployees(companyId, file);
+            const started = await api.bulkImportEmployees(companyId, file);
+            const result = started.success ? await api.waitForBulkImport(companyId, started.job_id) : started;
             
-            if (result.success) {
-                showAlert(`Successfully imported ${result.imported_count} employees!`, 'success');
+            if (result.success && result.job.status === 'completed') {
+                showAlert(`Successfully imported ${result.job.imported_count} employees!`, 'success');
                 closeModal(modal);
                 await this.showEmployees(companyId); // Refresh the list
             } else {
-                showAlert('Import failed: ' + result.message, 'error');
+                showAlert('Import failed: ' + (result.message || result.job.errors.slice(-1)[0]), 'error');
             }
         } catch (error) {
             showAlert('Import failed: ' + error.message, 'error');
@@ -460,8 +460,8 @@ class Employee {
         return `
             <div class="video-player">
                 <div class="video-container">
-                    <video id="trainingVideo" controls>
-                        <source src="${module.video_url || '/static/videos/sample-training.mp4'}" type="video/mp4">
+                    <video id="trainingVideo" controls preload="metadata">
+                        <source src="${module.video_url ? api.videoUrl(this.currentEmployee.id, module) : '/static/videos/sample-training.mp4'}" type="video/mp4">
                         Your browser does not support the video tag.
                     </video>
                 </div>
@@ -789,7 +789,7 @@ class Employee {
             await api.updateEmployeeProgress(this.currentEmployee.id, moduleId, { 
                 progress: Math.round(progress),
                 last_accessed: new Date().toISOString()
-            });
+            }, { immediate: progress >= 100 });
         } catch (error) {
             console.error('Failed to update progress:', error);
         }
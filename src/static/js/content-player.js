@@ -100,8 +100,9 @@ class ContentPlayer {
                            preload="metadata"
                            onloadedmetadata="contentPlayer.onVideoLoaded()"
                            ontimeupdate="contentPlayer.onTimeUpdate()"
+                           onpause="contentPlayer.saveProgress()"
                            onended="contentPlayer.onVideoEnded()">
-                        <source src="${this.currentModule.video_url}" type="video/mp4">
+                        <source src="${api.videoUrl(this.employeeId, this.currentModule)}" type="video/mp4">
                         Your browser does not support the video tag.
                     </video>
                     <div class="video-overlay" id="video-overlay" style="display: none;">
@@ -277,8 +278,8 @@ class ContentPlayer {
     onTimeUpdate() {
         const video = document.getElementById('training-video');
         if (video) {
+            // Only track here; the heartbeat timer sends the position
             this.currentPosition = video.currentTime;
-            this.saveProgress();
         }
     }
 
@@ -306,7 +307,7 @@ class ContentPlayer {
 
         this.progressTimer = setInterval(() => {
             this.saveProgress();
-        }, 30000); // Save progress every 30 seconds
+        }, 30000); // Heartbeat every 30 seconds
     }
 
     // Stop progress tracking
@@ -343,19 +344,14 @@ class ContentPlayer {
     }
 
     // Save progress
-    async saveProgress() {
+    async saveProgress(options = {}) {
         try {
-            const progressData = {
-                progress: this.getProgressPercentage(),
-                last_position: this.currentPosition,
-                last_accessed: new Date().toISOString()
-            };
-
-            await api.updateEmployeeProgress(
-                this.employeeId,
-                this.currentModule.id,
-                progressData
-            );
+            // Positions are buffered server-side; progress >= 100 is recorded as a completion
+            await api.sendProgressHeartbeat(this.employeeId, [{
+                module_id: this.currentModule.id,
+                last_position: Math.floor(this.currentPosition),
+                progress: this.getProgressPercentage()
+            }], options);
         } catch (error) {
             console.error('Failed to save progress:', error);
         }
@@ -380,8 +376,12 @@ class ContentPlayer {
             if (notesTextarea) {
                 this.notes = notesTextarea.value;
                 
-                await api.saveEmployeeNotes(this.employeeId, this.currentModule.id, this.notes);
-                showAlert('Notes saved successfully', 'success');
+                const response = await api.saveEmployeeNotes(this.employeeId, this.currentModule.id, this.notes);
+                if (response.queued) {
+                    showAlert('Notes will be saved when the connection is back', 'warning');
+                } else {
+                    showAlert('Notes saved successfully', 'success');
+                }
             }
         } catch (error) {
             console.error('Failed to save notes:', error);
@@ -401,7 +401,8 @@ class ContentPlayer {
             const response = await api.updateEmployeeProgress(
                 this.employeeId,
                 this.currentModule.id,
-                progressData
+                progressData,
+                { immediate: true }
             );
 
             if (response.success) {
@@ -440,7 +441,11 @@ class ContentPlayer {
                 const scrollPercentage = (scrollTop / scrollHeight) * 100;
                 
                 this.currentPosition = Math.max(this.currentPosition, scrollPercentage);
-                this.saveProgress();
+                if (this.currentPosition >= 100) {
+                    this.saveProgress();
+                } else if (!this.progressTimer) {
+                    this.startProgressTracking();
+                }
             });
         }
     }
@@ -448,7 +453,7 @@ class ContentPlayer {
     // Cleanup when leaving the page
     cleanup() {
         this.stopProgressTracking();
-        this.saveProgress();
+        this.saveProgress({ beacon: true });
         this.saveNotes();
     }
 }
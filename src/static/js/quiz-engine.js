@@ -352,24 +352,26 @@ class QuizEngine {
         this.updateQuizDisplay();
     }
 
-    // Download certificate
+    // Download certificate (PDF rendered and cached by the server)
     async downloadCertificate() {
         try {
             showLoading('Generating certificate...');
             
-            const result = await api.downloadCertificate(
+            const blob = await api.downloadCertificate(
                 this.currentQuiz.employeeId,
                 this.currentQuiz.moduleId
             );
             
             hideLoading();
             
-            if (result.success) {
-                // Create and download certificate
-                this.generateCertificatePDF(result.certificate);
-            } else {
-                showAlert('Failed to generate certificate', 'error');
-            }
+            const url = URL.createObjectURL(blob);
+            const link = document.createElement('a');
+            link.href = url;
+            link.download = `certificate-${this.currentQuiz.moduleId}.pdf`;
+            document.body.appendChild(link);
+            link.click();
+            link.remove();
+            URL.revokeObjectURL(url);
         } catch (error) {
             hideLoading();
             console.error('Certificate download failed:', error);
@@ -377,48 +379,6 @@ class QuizEngine {
         }
     }
 
-    // Generate certificate PDF (simplified)
-    generateCertificatePDF(certificateData) {
-        // Create a simple certificate HTML for download
-        const certificateHTML = `
-            <div style="text-align: center; padding: 50px; font-family: Arial, sans-serif;">
-                <h1 style="color: #2c5aa0; margin-bottom: 30px;">Certificate of Completion</h1>
-                <p style="font-size: 18px; margin-bottom: 20px;">This is to certify that</p>
-                <h2 style="color: #333; margin-bottom: 20px;">${certificateData.employee_name}</h2>
-                <p style="font-size: 18px; margin-bottom: 20px;">has successfully completed the training module</p>
-                <h3 style="color: #2c5aa0; margin-bottom: 30px;">${certificateData.module_title}</h3>
-                <p style="margin-bottom: 10px;">Score: ${certificateData.score}%</p>
-                <p style="margin-bottom: 10px;">Completed on: ${new Date(certificateData.completed_at).toLocaleDateString()}</p>
-                <p style="margin-bottom: 30px;">Certificate ID: ${certificateData.certificate_id}</p>
-                <p style="font-style: italic;">Starcomm Training System</p>
-            </div>
-        `;
-
-        // Create a new window and print
-        const printWindow = window.open('', '_blank');
-        printWindow.document.write(`
-            <html>
-                <head>
-                    <title>Certificate - ${certificateData.module_title}</title>
-                    <style>
-                        body { margin: 0; padding: 20px; }
-                        @media print { body { margin: 0; } }
-                    </style>
-                </head>
-                <body>
-                    ${certificateHTML}
-                    <script>
-                        window.onload = function() {
-                            window.print();
-                            window.close();
-                        }
-                    </script>
-                </body>
-            </html>
-        `);
-        printWindow.document.close();
-    }
-
     // Load saved quiz progress
     async loadSavedProgress(employeeId, moduleId) {
         try {
@@ -1,9 +1,46 @@
 // Router module for Starcomm Training System
 
+// Loads a role's component scripts on demand; the bundle map comes from the
+// #lazy-bundles block in index.html (rewritten to hashed bundles by `flask build-assets`)
+class BundleLoader {
+    constructor() {
+        const config = document.getElementById('lazy-bundles');
+        this.bundles = config ? JSON.parse(config.textContent) : {};
+        this.loading = {};
+    }
+
+    // Resolves once every script of the bundle has run; loads each bundle at most once
+    load(name) {
+        if (!this.loading[name]) {
+            const scripts = this.bundles[name] || [];
+            this.loading[name] = Promise.all(scripts.map(src => this.loadScript(src))).catch(error => {
+                delete this.loading[name];  // allow a retry on the next navigation
+                throw error;
+            });
+        }
+        return this.loading[name];
+    }
+
+    loadScript(src) {
+        return new Promise((resolve, reject) => {
+            const script = document.createElement('script');
+            script.src = src;
+            script.async = false;  // dynamically inserted scripts still run in insertion order
+            script.onload = resolve;
+            script.onerror = () => {
+                script.remove();
+                reject(new Error(`Failed to load ${src}`));
+            };
+            document.body.appendChild(script);
+        });
+    }
+}
+
 class Router {
     constructor() {
         this.routes = {};
         this.currentRoute = null;
+        this.bundles = new BundleLoader();
         this.init();
     }
 
@@ -13,31 +50,35 @@ class Router {
         this.addRoute('', this.showHome);
         this.addRoute('master/login', this.showMasterLogin);
         this.addRoute('master/dashboard', this.showMasterDashboard);
-        this.addRoute('master/companies', this.showMasterCompanies);
-        this.addRoute('master/create-company', this.showMasterCreateCompany);
-        this.addRoute('master/reports', this.showMasterReports);
+        this.addRoute('master/companies', this.showMasterCompanies, 'master');
+        this.addRoute('master/create-company', this.showMasterCreateCompany, 'master');
+        this.addRoute('master/reports', this.showMasterReports, 'master');
         
-        this.addRoute('company/:id/login', this.showCompanyLogin);
-        this.addRoute('company/:id/dashboard', this.showCompanyDashboard);
-        this.addRoute('company/:id/employees', this.showCompanyEmployees);
-        this.addRoute('company/:id/reports', this.showCompanyReports);
-        this.addRoute('company/:id/assign-training', this.showAssignTraining);
+        this.addRoute('company/:id/login', this.showCompanyLogin, 'company');
+        this.addRoute('company/:id/dashboard', this.showCompanyDashboard, 'company');
+        this.addRoute('company/:id/employees', this.showCompanyEmployees, 'company');
+        this.addRoute('company/:id/reports', this.showCompanyReports, 'company');
+        this.addRoute('company/:id/assign-training', this.showAssignTraining, 'company');
         
-        this.addRoute('training/:id/login', this.showEmployeeLogin);
-        this.addRoute('training/:id/dashboard', this.showEmployeeDashboard);
-        this.addRoute('training/:id/training/:moduleId', this.showTrainingModule);
-        this.addRoute('training/:id/quiz/:moduleId', this.showQuiz);
-        this.addRoute('training/:id/progress', this.showEmployeeProgress);
-        this.addRoute('training/:id/certificates', this.showEmployeeCertificates);
+        this.addRoute('training/:id/login', this.showEmployeeLogin, 'employee');
+        this.addRoute('training/:id/dashboard', this.showEmployeeDashboard, 'employee');
+        this.addRoute('training/:id/training/:moduleId', this.showTrainingModule, 'employee');
+        this.addRoute('training/:id/quiz/:moduleId', this.showQuiz, 'employee');
+        this.addRoute('training/:id/progress', this.showEmployeeProgress, 'employee');
+        this.addRoute('training/:id/certificates', this.showEmployeeCertificates, 'employee');
 
         // Listen for hash changes
         window.addEventListener('hashchange', () => this.handleRoute());
         window.addEventListener('load', () => this.handleRoute());
     }
 
-    // Add route
-    addRoute(path, handler) {
-        this.routes[path] = handler.bind(this);
+    // Add route; handlers of a role's routes first load that role's component bundle
+    addRoute(path, handler, bundle = null) {
+        const bound = handler.bind(this);
+        this.routes[path] = bundle ? async (params) => {
+            await this.bundles.load(bundle);
+            return bound(params);
+        } : bound;
     }
 
     // Handle route change
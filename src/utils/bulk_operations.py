@@ -0,0 +1,236 @@
+"""
+Bulk database operations for Starcomm Training System
+"""
+
+import csv
+import json
+import logging
+import os
+import secrets
+import string
+import threading
+from datetime import datetime
+from sqlalchemy.dialects import postgresql
+from src.models.database import db, Employee, EmployeeProgress, ImportJob
+from src.utils.security import PasswordSecurity
+
+logger = logging.getLogger(__name__)
+
+# Keep IN lists and multi-row VALUES under SQLite's bound-parameter limit
+CHUNK_SIZE = 500
+
+
+def chunked(items, size=CHUNK_SIZE):
+    """Yield successive slices of a list"""
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def insert_ignore_duplicates(table):
+    """Dialect-native INSERT that skips rows hitting a unique constraint"""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        return postgresql.insert(table).on_conflict_do_nothing()
+    if dialect == 'sqlite':
+        return table.insert().prefix_with('OR IGNORE')
+    return table.insert()
+
+
+def insert_ignore_returning_keys(table, rows, *key_columns):
+    """Insert rows skipping duplicates and return the keys actually inserted.
+
+    Uses INSERT ... RETURNING, batched into multi-row statements, on dialects
+    that support it. Returns None elsewhere, since executemany rowcounts do
+    not say which (or reliably how many) rows were skipped.
+    """
+    dialect = db.session.get_bind().dialect
+    if dialect.name not in ('postgresql', 'sqlite') or not dialect.insert_executemany_returning:
+        db.session.execute(insert_ignore_duplicates(table), rows)
+        return None
+    statement = insert_ignore_duplicates(table).returning(*(table.c[key] for key in key_columns))
+    return {tuple(row) for row in db.session.execute(statement, rows)}
+
+
+def existing_assignment_pairs(employee_ids, module_ids):
+    """Load existing (employee_id, module_id) pairs for the given ids"""
+    pairs = set()
+    for employee_chunk in chunked(employee_ids):
+        rows = db.session.query(
+            EmployeeProgress.employee_id,
+            EmployeeProgress.module_id
+        ).filter(
+            EmployeeProgress.employee_id.in_(employee_chunk),
+            EmployeeProgress.module_id.in_(module_ids)
+        ).all()
+        pairs.update((employee_id, module_id) for employee_id, module_id in rows)
+    return pairs
+
+
+def bulk_assign_training(company_id, employee_ids, module_ids):
+    """Assign every module to every employee of a company in a set-based way.
+
+    Existing pairs are loaded up front and only the missing ones are
+    inserted, using the unique_employee_module constraint to ignore rows
+    created concurrently. Rollups are incremented from the rows actually
+    inserted. Returns (created, skipped). Does not commit.
+    """
+    from src.utils.training_stats import TrainingStats
+
+    employee_ids = list(dict.fromkeys(employee_ids))
+    module_ids = list(dict.fromkeys(module_ids))
+
+    existing = existing_assignment_pairs(employee_ids, module_ids)
+    now = datetime.utcnow()
+    rows = [
+        {
+            'employee_id': employee_id,
+            'module_id': module_id,
+            'started_date': now,
+            'attempts': 0,
+            'time_spent_minutes': 0,
+            'is_completed': False,
+            'last_position': 0
+        }
+        for employee_id in employee_ids
+        for module_id in module_ids
+        if (employee_id, module_id) not in existing
+    ]
+
+    created = 0
+    if rows:
+        inserted = insert_ignore_returning_keys(EmployeeProgress.__table__, rows, 'employee_id', 'module_id')
+        if inserted is None:
+            # The dialect cannot report which rows it skipped; recount this company
+            TrainingStats.refresh_company(company_id)
+            created = len(existing_assignment_pairs(employee_ids, module_ids)) - len(existing)
+        else:
+            deltas = {}
+            for _, module_id in inserted:
+                assigned, completed = deltas.get((company_id, module_id), (0, 0))
+                deltas[(company_id, module_id)] = (assigned + 1, completed)
+            TrainingStats.record_many(deltas)
+            created = len(inserted)
+
+    skipped = len(employee_ids) * len(module_ids) - created
+    return created, skipped
+
+
+class EmployeeCsvImporter:
+    """Streaming, chunked employee CSV import run as a background job"""
+
+    CHUNK_SIZE = int(os.getenv('BULK_IMPORT_CHUNK_SIZE', '500'))
+    MAX_STORED_ERRORS = 1000
+
+    def __init__(self, app, job_id, company_id, path, chunk_size=None):
+        self.app = app
+        self.job_id = job_id
+        self.company_id = company_id
+        self.path = path
+        self.chunk_size = chunk_size or self.CHUNK_SIZE
+        self.seen_emails = set()
+        self.errors = []
+        self.error_count = 0
+        self.processed_rows = 0
+        self.imported_count = 0
+
+    def start(self):
+        """Run the import on a daemon thread"""
+        thread = threading.Thread(target=self.run, name=f'employee-import-{self.job_id}', daemon=True)
+        thread.start()
+        return thread
+
+    def run(self):
+        """Parse the CSV incrementally and import it chunk by chunk"""
+        with self.app.app_context():
+            try:
+                self._update_job(status='running')
+                with open(self.path, newline='', encoding='utf-8-sig') as csv_file:
+                    chunk = []
+                    # Start at 2 because row 1 is headers
+                    for row_num, row in enumerate(csv.DictReader(csv_file), start=2):
+                        chunk.append((row_num, row))
+                        if len(chunk) >= self.chunk_size:
+                            self._import_chunk(chunk)
+                            chunk = []
+                    if chunk:
+                        self._import_chunk(chunk)
+                self._update_job(status='completed', finished_date=datetime.utcnow())
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Employee import job {self.job_id} failed: {str(e)}")
+                self._add_error(f"Import aborted: {str(e)}")
+                self._update_job(status='failed', finished_date=datetime.utcnow())
+            finally:
+                db.session.remove()
+                try:
+                    os.remove(self.path)
+                except OSError:
+                    pass
+
+    def _add_error(self, message):
+        self.error_count += 1
+        if len(self.errors) < self.MAX_STORED_ERRORS:
+            self.errors.append(message)
+
+    def _import_chunk(self, chunk):
+        """Validate, de-duplicate, hash and insert one chunk, then commit it"""
+        candidates = []
+        for row_num, row in chunk:
+            name = (row.get('name') or '').strip()
+            email = (row.get('email') or '').strip()
+            if not name or not email:
+                self._add_error(f"Row {row_num}: Missing required fields")
+                continue
+            if email in self.seen_emails:
+                self._add_error(f"Row {row_num}: Email {email} is duplicated in the file")
+                continue
+            self.seen_emails.add(email)
+            candidates.append((row_num, row, name, email))
+
+        # One lookup per chunk instead of one per row
+        existing = set()
+        if candidates:
+            existing = {
+                email for (email,) in db.session.query(Employee.email).filter(
+                    Employee.email.in_([c[3] for c in candidates])
+                ).all()
+            }
+
+        new_rows = []
+        passwords = []
+        for row_num, row, name, email in candidates:
+            if email in existing:
+                self._add_error(f"Row {row_num}: Email {email} already exists")
+                continue
+            passwords.append(''.join(secrets.choice(string.ascii_letters + string.digits) for _ in range(8)))
+            new_rows.append({
+                'company_id': self.company_id,
+                'name': name,
+                'email': email,
+                'department': row.get('department'),
+                'employee_id': row.get('employee_id'),
+                'created_date': datetime.utcnow(),
+                'is_active': True
+            })
+
+        # Hash the whole chunk at once so it can use the process pool
+        for new_row, hashed_password in zip(new_rows, PasswordSecurity.hash_passwords(passwords)):
+            new_row['password'] = hashed_password
+
+        if new_rows:
+            db.session.execute(Employee.__table__.insert(), new_rows)
+
+        self.processed_rows += len(chunk)
+        self.imported_count += len(new_rows)
+        self._update_job()
+
+    def _update_job(self, **fields):
+        """Persist job progress and commit (also commits the current chunk)"""
+        job = db.session.get(ImportJob, self.job_id)
+        job.processed_rows = self.processed_rows
+        job.imported_count = self.imported_count
+        job.error_count = self.error_count
+        job.errors = json.dumps(self.errors)
+        for key, value in fields.items():
+            setattr(job, key, value)
+        db.session.commit()
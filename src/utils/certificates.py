@@ -0,0 +1,246 @@
+"""
+Certificate utilities for Starcomm Training System
+
+Certificates are rendered server-side as single-page PDFs by a small
+pure-Python writer (base-14 Helvetica fonts, no external services). The
+output is deterministic for a given certificate, so rendered files are
+stored in a content-addressed disk cache keyed by a hash of the
+certificate fields and served straight from disk on repeat downloads.
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+import zlib
+from src.models.database import db, Employee, TrainingModule, EmployeeProgress
+
+logger = logging.getLogger(__name__)
+
+# Bump when the layout changes so cached files are re-rendered
+CERTIFICATE_LAYOUT_VERSION = '1'
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'database', 'certificates')
+
+# Advance widths (1/1000 em) for printable ASCII, from the Adobe base-14 AFM files
+_HELVETICA_WIDTHS = [
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584
+]
+_HELVETICA_BOLD_WIDTHS = [
+    278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 333, 333, 584, 584, 584, 611,
+    975, 722, 722, 722, 722, 667, 611, 778, 722, 278, 556, 722, 611, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 333, 278, 333, 584, 556,
+    333, 556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889, 611, 611,
+    611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500, 389, 280, 389, 584
+]
+_FONTS = {
+    'F1': ('Helvetica', _HELVETICA_WIDTHS),
+    'F2': ('Helvetica-Bold', _HELVETICA_BOLD_WIDTHS),
+    'F3': ('Helvetica-Oblique', _HELVETICA_WIDTHS),
+}
+
+
+class CertificatePDF:
+    """Minimal single-page PDF writer for completion certificates"""
+
+    PAGE_WIDTH = 792   # US Letter, landscape
+    PAGE_HEIGHT = 612
+
+    def __init__(self):
+        self.ops = []
+
+    @staticmethod
+    def _encode(text):
+        return str(text).encode('cp1252', errors='replace')
+
+    @staticmethod
+    def text_width(text, font, size):
+        widths = _FONTS[font][1]
+        total = sum(
+            widths[byte - 32] if 32 <= byte <= 126 else 556
+            for byte in CertificatePDF._encode(text)
+        )
+        return total * size / 1000.0
+
+    def fit_size(self, text, font, size, max_width, min_size=10):
+        """Shrink the font size until the text fits the width"""
+        while size > min_size and self.text_width(text, font, size) > max_width:
+            size -= 1
+        return size
+
+    def centered_text(self, text, y, font='F1', size=12, color=(0.2, 0.2, 0.2)):
+        raw = self._encode(text)
+        escaped = raw.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+        x = (self.PAGE_WIDTH - self.text_width(text, font, size)) / 2
+        self.ops.append(
+            b'BT %.3f %.3f %.3f rg /%s %d Tf %.2f %.2f Td (%s) Tj ET' % (
+                color[0], color[1], color[2], font.encode(), size, x, y, escaped
+            )
+        )
+
+    def rectangle(self, x, y, width, height, line_width=1, color=(0.17, 0.35, 0.63)):
+        self.ops.append(
+            b'%.3f %.3f %.3f RG %.2f w %.2f %.2f %.2f %.2f re S' % (
+                color[0], color[1], color[2], line_width, x, y, width, height
+            )
+        )
+
+    def line(self, x1, y1, x2, y2, line_width=1, color=(0.17, 0.35, 0.63)):
+        self.ops.append(
+            b'%.3f %.3f %.3f RG %.2f w %.2f %.2f m %.2f %.2f l S' % (
+                color[0], color[1], color[2], line_width, x1, y1, x2, y2
+            )
+        )
+
+    def to_bytes(self):
+        """Serialize the page as a PDF 1.4 file"""
+        content = zlib.compress(b'\n'.join(self.ops))
+        font_ids = {name: 5 + index for index, name in enumerate(_FONTS)}
+        fonts = b' '.join(b'/%s %d 0 R' % (name.encode(), obj) for name, obj in font_ids.items())
+
+        objects = [
+            b'<< /Type /Catalog /Pages 2 0 R >>',
+            b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+            b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Resources << /Font << %s >> >> /Contents 4 0 R >>' % (
+                self.PAGE_WIDTH, self.PAGE_HEIGHT, fonts
+            ),
+            b'<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream' % (len(content), content),
+        ]
+        for base_font, _ in _FONTS.values():
+            objects.append(
+                b'<< /Type /Font /Subtype /Type1 /BaseFont /%s /Encoding /WinAnsiEncoding >>' % base_font.encode()
+            )
+
+        output = bytearray(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(len(output))
+            output += b'%d 0 obj\n%s\nendobj\n' % (number, body)
+        xref_offset = len(output)
+        output += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+        for offset in offsets:
+            output += b'%010d 00000 n \n' % offset
+        output += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref_offset)
+        return bytes(output)
+
+    @staticmethod
+    def render(certificate):
+        """Render a certificate dict (see CertificateStore.certificate_data) to PDF bytes"""
+        pdf = CertificatePDF()
+        width, height = pdf.PAGE_WIDTH, pdf.PAGE_HEIGHT
+        blue = (0.17, 0.35, 0.63)
+
+        pdf.rectangle(24, 24, width - 48, height - 48, line_width=4)
+        pdf.rectangle(34, 34, width - 68, height - 68, line_width=1)
+
+        pdf.centered_text('Certificate of Completion', 470, font='F2', size=36, color=blue)
+        pdf.centered_text('This is to certify that', 415, size=16)
+        name_size = pdf.fit_size(certificate['employee_name'], 'F2', 30, width - 160)
+        pdf.centered_text(certificate['employee_name'], 365, font='F2', size=name_size, color=(0.1, 0.1, 0.1))
+        pdf.line(200, 355, width - 200, 355)
+        pdf.centered_text('has successfully completed the training module', 320, size=16)
+        title_size = pdf.fit_size(certificate['module_title'], 'F2', 24, width - 160)
+        pdf.centered_text(certificate['module_title'], 275, font='F2', size=title_size, color=blue)
+
+        details = f"Completed on {certificate['completed_display']}"
+        if certificate.get('score') is not None:
+            details += f"  |  Score: {certificate['score']}%"
+        pdf.centered_text(details, 215, size=14)
+        if certificate.get('company_name'):
+            pdf.centered_text(certificate['company_name'], 185, size=14)
+
+        pdf.centered_text('Starcomm Training System', 110, font='F3', size=14)
+        pdf.centered_text(f"Certificate ID: {certificate['certificate_id']}", 70, size=10, color=(0.4, 0.4, 0.4))
+        return pdf.to_bytes()
+
+
+class CertificateStore:
+    """Content-addressed disk cache of rendered certificate PDFs"""
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir or os.getenv('CERTIFICATE_CACHE_DIR', DEFAULT_CACHE_DIR)
+
+    @staticmethod
+    def certificate_data(employee, module, progress, company_name=None):
+        """Fields printed on a certificate for a completed progress row"""
+        completed_date = progress.completed_date
+        return {
+            'certificate_id': f"CERT-{employee.id}-{module.id}-{completed_date.strftime('%Y%m%d') if completed_date else 'unknown'}",
+            'employee_name': employee.name,
+            'module_title': module.title,
+            'company_name': company_name,
+            'completed_at': completed_date.isoformat() if completed_date else None,
+            'completed_display': completed_date.strftime('%B %d, %Y') if completed_date else 'Unknown',
+            'score': progress.score
+        }
+
+    @staticmethod
+    def content_key(certificate):
+        """Hash of everything that affects the rendered file"""
+        fields = [CERTIFICATE_LAYOUT_VERSION] + [
+            str(certificate.get(name)) for name in sorted(certificate)
+        ]
+        return hashlib.sha256('\x1f'.join(fields).encode('utf-8')).hexdigest()
+
+    def path_for(self, key):
+        return os.path.join(self.cache_dir, key[:2], f'{key}.pdf')
+
+    def get_or_render(self, certificate):
+        """Return (path, key) of the cached PDF, rendering it on a miss"""
+        key = self.content_key(certificate)
+        path = self.path_for(key)
+        if os.path.exists(path):
+            return path, key
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = CertificatePDF.render(certificate)
+        # Write then rename so concurrent readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                tmp.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return path, key
+
+    def prerender_company(self, company_id, batch_size=500):
+        """Render every completed certificate for a company; returns (rendered, already_cached)"""
+        from src.models.database import Company
+
+        company = db.session.get(Company, company_id)
+        company_name = company.name if company else None
+
+        rows = db.session.query(Employee, TrainingModule, EmployeeProgress).join(
+            EmployeeProgress, EmployeeProgress.employee_id == Employee.id
+        ).join(
+            TrainingModule, TrainingModule.id == EmployeeProgress.module_id
+        ).filter(
+            Employee.company_id == company_id,
+            EmployeeProgress.is_completed == True
+        ).order_by(EmployeeProgress.id).yield_per(batch_size)
+
+        rendered = cached = 0
+        for employee, module, progress in rows:
+            certificate = self.certificate_data(employee, module, progress, company_name)
+            if os.path.exists(self.path_for(self.content_key(certificate))):
+                cached += 1
+                continue
+            try:
+                self.get_or_render(certificate)
+                rendered += 1
+            except Exception as e:
+                logger.error(f"Failed to render certificate {certificate['certificate_id']}: {str(e)}")
+        return rendered, cached
+
+
+# Global certificate store instance
+certificate_store = CertificateStore()
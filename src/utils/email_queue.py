@@ -0,0 +1,214 @@
+"""
+Outbound email queue worker for Starcomm Training System
+
+Messages are stored in the outbound_emails table by
+EmailService.enqueue_email and delivered by a background worker that
+reuses authenticated SMTP connections, sends in batches and retries
+failures with exponential backoff. Several workers (one per gunicorn
+process) can run at once; each message is claimed with a conditional
+UPDATE so it is delivered by exactly one of them.
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from src.models.database import db, OutboundEmail
+from src.utils.email_service import email_service
+
+logger = logging.getLogger(__name__)
+
+
+class SMTPConnectionPool:
+    """Bounded pool of authenticated SMTP connections"""
+
+    def __init__(self, service, size=4, max_idle_seconds=60):
+        self.service = service
+        self.size = size
+        self.max_idle_seconds = max_idle_seconds
+        self.idle = queue.LifoQueue(maxsize=size)  # (server, last_used)
+
+    def acquire(self):
+        """Reuse an idle connection that is still alive, or open a new one"""
+        while True:
+            try:
+                server, last_used = self.idle.get_nowait()
+            except queue.Empty:
+                return self.service.connect()
+            if time.time() - last_used > self.max_idle_seconds:
+                self._close(server)
+                continue
+            try:
+                if server.noop()[0] == 250:
+                    return server
+            except Exception:
+                pass
+            self._close(server)
+
+    def release(self, server, broken=False):
+        """Return a connection to the pool, closing it if broken or the pool is full"""
+        if broken:
+            self._close(server)
+            return
+        try:
+            self.idle.put_nowait((server, time.time()))
+        except queue.Full:
+            self._close(server)
+
+    def close_all(self):
+        while True:
+            try:
+                server, _ = self.idle.get_nowait()
+            except queue.Empty:
+                return
+            self._close(server)
+
+    @staticmethod
+    def _close(server):
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+
+class EmailQueueWorker:
+    """Background sender for the outbound email queue"""
+
+    def __init__(self, app, service=None, pool_size=None, batch_size=None, poll_interval=None,
+                 max_attempts=None, backoff_seconds=None, stale_claim_minutes=10):
+        self.app = app
+        self.service = service or email_service
+        self.pool_size = pool_size or int(os.getenv('EMAIL_POOL_SIZE', '4'))
+        self.batch_size = batch_size or int(os.getenv('EMAIL_BATCH_SIZE', '50'))
+        self.poll_interval = poll_interval or float(os.getenv('EMAIL_POLL_INTERVAL', '5'))
+        self.max_attempts = max_attempts or int(os.getenv('EMAIL_MAX_ATTEMPTS', '5'))
+        self.backoff_seconds = backoff_seconds or int(os.getenv('EMAIL_BACKOFF_SECONDS', '30'))
+        self.stale_claim_minutes = stale_claim_minutes
+        self.pool = SMTPConnectionPool(self.service, size=self.pool_size)
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        """Start the worker on a daemon thread"""
+        self.thread = threading.Thread(target=self.run, name='email-queue-worker', daemon=True)
+        self.thread.start()
+        return self.thread
+
+    def stop(self):
+        self.stop_event.set()
+
+    def run(self):
+        with ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix='email-sender') as executor:
+            while not self.stop_event.is_set():
+                try:
+                    sent = self.process_batch(executor)
+                except Exception as e:
+                    logger.error(f"Email queue batch failed: {str(e)}")
+                    sent = 0
+                # Keep draining while there is work, otherwise wait for the next poll
+                if not sent:
+                    self.stop_event.wait(self.poll_interval)
+        self.pool.close_all()
+
+    def claim_batch(self):
+        """Claim up to batch_size due messages for this worker"""
+        now = datetime.utcnow()
+        stale = now - timedelta(minutes=self.stale_claim_minutes)
+        due = db.or_(
+            db.and_(OutboundEmail.status == 'queued', OutboundEmail.next_attempt_at <= now),
+            db.and_(OutboundEmail.status == 'sending', OutboundEmail.claimed_at < stale)
+        )
+        candidate_ids = [
+            message_id for (message_id,) in db.session.query(OutboundEmail.id).filter(due).order_by(
+                OutboundEmail.next_attempt_at
+            ).limit(self.batch_size).all()
+        ]
+
+        claimed = []
+        for message_id in candidate_ids:
+            result = db.session.execute(
+                OutboundEmail.__table__.update().where(
+                    OutboundEmail.id == message_id, due
+                ).values(status='sending', claimed_at=now)
+            )
+            if result.rowcount == 1:
+                claimed.append(message_id)
+        db.session.commit()
+
+        if not claimed:
+            return []
+        return OutboundEmail.query.filter(OutboundEmail.id.in_(claimed)).all()
+
+    def _deliver(self, message):
+        """Send one message over a pooled connection; returns None or the error text"""
+        mime = self.service.build_message(
+            message.to_email, message.subject, message.html_content,
+            message.text_content, message.get_attachments()
+        )
+        server = None
+        try:
+            server = self.pool.acquire()
+            server.send_message(mime)
+            self.pool.release(server)
+            return None
+        except Exception as e:
+            if server is not None:
+                self.pool.release(server, broken=True)
+            return str(e)
+
+    def process_batch(self, executor):
+        """Claim and deliver one batch; returns the number of messages handled"""
+        with self.app.app_context():
+            try:
+                messages = self.claim_batch()
+                if not messages:
+                    return 0
+
+                errors = list(executor.map(self._deliver, messages))
+
+                now = datetime.utcnow()
+                for message, error in zip(messages, errors):
+                    message.attempts = (message.attempts or 0) + 1
+                    message.claimed_at = None
+                    if error is None:
+                        message.status = 'sent'
+                        message.sent_date = now
+                        message.last_error = None
+                    elif message.attempts >= self.max_attempts:
+                        message.status = 'failed'
+                        message.last_error = error
+                        logger.error(f"Giving up on email {message.id} to {message.to_email}: {error}")
+                    else:
+                        message.status = 'queued'
+                        message.last_error = error
+                        message.next_attempt_at = now + timedelta(
+                            seconds=self.backoff_seconds * (2 ** (message.attempts - 1))
+                        )
+                db.session.commit()
+                return len(messages)
+            finally:
+                db.session.remove()
+
+    @staticmethod
+    def delivery_summary():
+        """Count of queued messages per status"""
+        return dict(
+            db.session.query(OutboundEmail.status, db.func.count(OutboundEmail.id)).group_by(
+                OutboundEmail.status
+            ).all()
+        )
+
+
+def start_email_queue_worker(app):
+    """Start the queue worker unless disabled with EMAIL_QUEUE_WORKER=false"""
+    if os.getenv('EMAIL_QUEUE_WORKER', 'true').lower() != 'true':
+        return None
+    worker = EmailQueueWorker(app)
+    worker.start()
+    return worker
@@ -0,0 +1,38 @@
+"""
+Email template utilities for Starcomm Training System
+
+Email bodies live in src/templates/email and are compiled by Jinja2 once
+per process. The compiled template keeps the static HTML shell (layout and
+CSS) as constants, so rendering a message only substitutes the recipient's
+values. HTML templates are auto-escaped.
+"""
+
+import os
+from jinja2 import Environment, FileSystemLoader, StrictUndefined, select_autoescape
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'templates')
+
+
+class EmailTemplates:
+    """Loads, compiles and caches email templates"""
+
+    def __init__(self, template_dir=TEMPLATE_DIR):
+        self.env = Environment(
+            loader=FileSystemLoader(template_dir),
+            autoescape=select_autoescape(['html']),
+            undefined=StrictUndefined,
+            # Templates ship with the code; don't stat the file on every render
+            auto_reload=os.getenv('EMAIL_TEMPLATE_AUTO_RELOAD', 'false').lower() == 'true',
+            cache_size=-1
+        )
+
+    def get(self, name):
+        """Compiled template for email/<name>"""
+        return self.env.get_template(f'email/{name}')
+
+    def render(self, name, **context):
+        return self.get(name).render(**context)
+
+
+# Global email template instance
+email_templates = EmailTemplates()
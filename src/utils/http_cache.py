@@ -0,0 +1,116 @@
+"""
+HTTP caching utilities for Starcomm Training System
+"""
+
+import gzip
+import os
+import threading
+from datetime import datetime
+from flask import current_app, request, Response
+from src.models.database import db, TrainingModule, CatalogueVersion
+
+
+class ModuleCatalogue:
+    """Versioned, pre-serialized training module catalogue responses.
+
+    Each variant (a different projection of the module table) is serialized
+    once per catalogue version and kept in memory as raw and gzip bytes.
+    Responses carry a strong ETag (suffixed -gz for the gzip body) and
+    Last-Modified derived from the version so clients revalidate with
+    If-None-Match and receive 304s.
+    """
+
+    def __init__(self):
+        self.entries = {}  # variant -> (version, etag, last_modified, body, gzip_body)
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def current_version():
+        """(version, updated_date) of the catalogue; one single-row read"""
+        row = db.session.get(CatalogueVersion, 1)
+        if not row:
+            return 0, None
+        return row.version, row.updated_date
+
+    def _build(self, variant, version, updated_date, serialize):
+        modules = TrainingModule.query.order_by(TrainingModule.id).all()
+        payload = {'success': True, 'modules': [serialize(module) for module in modules]}
+        body = current_app.json.dumps(payload).encode('utf-8')
+        etag = f'modules-{variant}-v{version}'
+        last_modified = updated_date or datetime.utcnow()
+        return version, etag, last_modified, body, gzip.compress(body, compresslevel=6)
+
+    def response(self, variant, serialize):
+        """Conditional response for a catalogue variant"""
+        version, updated_date = self.current_version()
+        with self.lock:
+            entry = self.entries.get(variant)
+        if not entry or entry[0] != version:
+            entry = self._build(variant, version, updated_date, serialize)
+            with self.lock:
+                self.entries[variant] = entry
+        _, etag, last_modified, body, gzip_body = entry
+
+        # Each representation gets its own strong validator
+        use_gzip = 'gzip' in request.headers.get('Accept-Encoding', '')
+        if use_gzip:
+            etag = f'{etag}-gz'
+
+        response = Response(mimetype='application/json')
+        response.set_etag(etag)
+        response.last_modified = last_modified
+        response.headers['Cache-Control'] = 'private, no-cache'
+        response.headers['Vary'] = 'Accept-Encoding'
+
+        if request.if_none_match.contains(etag) or (
+            not request.if_none_match and request.if_modified_since
+            and last_modified.replace(microsecond=0) <= request.if_modified_since.replace(tzinfo=None)
+        ):
+            response.status_code = 304
+            return response
+
+        if use_gzip:
+            response.set_data(gzip_body)
+            response.headers['Content-Encoding'] = 'gzip'
+        else:
+            response.set_data(body)
+        return response
+
+
+# Global catalogue cache instance
+module_catalogue = ModuleCatalogue()
+
+
+def compress_json_responses(app, min_size=None, level=None):
+    """Gzip JSON responses larger than min_size bytes for clients that accept it.
+
+    Responses that already carry a Content-Encoding (the pre-compressed
+    catalogue) or are streamed are left alone.
+    """
+    min_size = min_size or int(os.getenv('JSON_GZIP_MIN_BYTES', '1024'))
+    level = level or int(os.getenv('JSON_GZIP_LEVEL', '6'))
+
+    @app.after_request
+    def gzip_json(response):
+        if (
+            response.mimetype != 'application/json'
+            or response.status_code < 200 or response.status_code in (204, 206, 304)
+            or response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+        ):
+            return response
+        response.vary.add('Accept-Encoding')
+        if 'gzip' not in request.headers.get('Accept-Encoding', ''):
+            return response
+
+        body = response.get_data()
+        if len(body) < min_size:
+            return response
+        response.set_data(gzip.compress(body, compresslevel=level))
+        response.headers['Content-Encoding'] = 'gzip'
+        # A strong validator must change with the representation
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+    return app
@@ -0,0 +1,146 @@
+"""
+Training video utilities for Starcomm Training System
+
+Videos are served by an access-checked endpoint instead of the public
+static folder. Responses support single byte ranges (206 Partial Content,
+If-Range), strong ETags and revalidation, and are built from one stat()
+call: the file body is never read through Python under gunicorn, which
+sends the requested range with sendfile(). Access decisions are cached
+briefly per (employee, module) so the many range requests issued while
+seeking do not each query the database.
+"""
+
+import os
+from flask import request, Response
+from werkzeug.http import http_date
+from werkzeug.security import safe_join
+from src.models.database import db, Employee, Company, TrainingModule
+from src.utils.reports import TTLCache
+
+DEFAULT_VIDEO_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'media', 'videos')
+
+# Module video_url values of this form refer to files in the video directory
+LOCAL_VIDEO_PREFIX = '/static/videos/'
+
+# WSGI servers whose file_wrapper honours Content-Length (and uses sendfile)
+SENDFILE_SERVERS = ('gunicorn',)
+
+
+class _FileRange:
+    """Iterable over length bytes of an open file, for servers without a suitable file_wrapper"""
+
+    def __init__(self, file, length, block_size=64 * 1024):
+        self.file = file
+        self.remaining = length
+        self.block_size = block_size
+
+    def __iter__(self):
+        while self.remaining > 0:
+            data = self.file.read(min(self.block_size, self.remaining))
+            if not data:
+                break
+            self.remaining -= len(data)
+            yield data
+
+    def close(self):
+        self.file.close()
+
+
+class VideoLibrary:
+    """Resolves, authorizes and streams training module videos"""
+
+    def __init__(self, video_dir=None, access_ttl=None, max_age=None):
+        self.video_dir = video_dir or os.getenv('TRAINING_VIDEO_DIR', DEFAULT_VIDEO_DIR)
+        self.access_cache = TTLCache(
+            ttl=access_ttl if access_ttl is not None else float(os.getenv('MEDIA_ACCESS_CACHE_SECONDS', '60')),
+            max_entries=50000
+        )
+        self.max_age = max_age if max_age is not None else int(os.getenv('MEDIA_MAX_AGE', '86400'))
+
+    def path_for(self, video_url):
+        """Filesystem path of a local module video, or None for external URLs"""
+        if not video_url or not video_url.startswith(LOCAL_VIDEO_PREFIX):
+            return None
+        return safe_join(self.video_dir, video_url[len(LOCAL_VIDEO_PREFIX):])
+
+    def _lookup(self, employee_id, module_id):
+        row = db.session.query(TrainingModule.video_url).join(
+            Employee, Employee.id == employee_id
+        ).join(
+            Company, Company.id == Employee.company_id
+        ).filter(
+            TrainingModule.id == module_id,
+            Employee.is_active == True,
+            Company.is_active == True
+        ).first()
+        return self.path_for(row[0]) if row else None
+
+    def authorized_path(self, employee_id, module_id):
+        """Video path the (authenticated) employee may stream for a module, or None"""
+        return self.access_cache.get_or_compute(
+            (employee_id, module_id), lambda: self._lookup(employee_id, module_id)
+        )
+
+    @staticmethod
+    def etag_for(stat):
+        return f'{stat.st_ino:x}-{stat.st_size:x}-{stat.st_mtime_ns:x}'
+
+    def send(self, path, mimetype='video/mp4'):
+        """Conditional, range-aware response for a video file; raises FileNotFoundError if missing"""
+        stat = os.stat(path)
+        size = stat.st_size
+        etag = self.etag_for(stat)
+
+        response = Response(mimetype=mimetype, direct_passthrough=True)
+        response.set_etag(etag)
+        response.headers['Last-Modified'] = http_date(stat.st_mtime)
+        response.headers['Accept-Ranges'] = 'bytes'
+        # Private: every request is access-checked
+        response.headers['Cache-Control'] = f'private, max-age={self.max_age}'
+
+        if request.if_none_match.contains(etag):
+            response.status_code = 304
+            return response
+
+        start, stop = 0, size
+        if request.range and self._if_range_matches(etag, stat):
+            byte_range = request.range.range_for_length(size)
+            if byte_range is None:
+                # Multiple ranges are answered with the whole file; anything else is unsatisfiable
+                if len(request.range.ranges) == 1:
+                    response.status_code = 416
+                    response.headers['Content-Range'] = f'bytes */{size}'
+                    response.content_length = 0
+                    return response
+            else:
+                start, stop = byte_range
+                response.status_code = 206
+                response.headers['Content-Range'] = f'bytes {start}-{stop - 1}/{size}'
+
+        response.content_length = stop - start
+        if request.method == 'HEAD':
+            return response
+
+        video = open(path, 'rb')
+        video.seek(start)
+        file_wrapper = request.environ.get('wsgi.file_wrapper')
+        if file_wrapper and request.environ.get('SERVER_SOFTWARE', '').startswith(SENDFILE_SERVERS):
+            # sendfile() from the current offset for Content-Length bytes
+            response.response = file_wrapper(video)
+        else:
+            response.response = _FileRange(video, stop - start)
+        return response
+
+    @staticmethod
+    def _if_range_matches(etag, stat):
+        """A Range applies unless If-Range names a different version of the file"""
+        if_range = request.if_range
+        if if_range.etag:
+            return if_range.etag == etag
+        if if_range.date:
+            return int(stat.st_mtime) <= if_range.date.timestamp()
+        return True
+
+
+# Global video library instance
+video_library = VideoLibrary()
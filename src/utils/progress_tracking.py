@@ -0,0 +1,262 @@
+"""
+Progress tracking utilities for Starcomm Training System
+
+Playback heartbeats only move last_position, so they are coalesced in a
+per-process write-behind buffer keyed by (employee, module) and written by
+a background flusher as one batched UPDATE every few seconds. Each
+buffered position carries the time it was recorded and is only written if
+the row's position_updated_at is not newer, so a flush never overwrites a
+position written directly in the meantime (by any worker). Completion
+events are not buffered: they are applied synchronously together with the
+training statistics rollups.
+"""
+
+import atexit
+import logging
+import os
+import threading
+from datetime import datetime
+from sqlalchemy import bindparam
+from src.models.database import db, Employee, TrainingModule, EmployeeProgress
+from src.utils.bulk_operations import insert_ignore_returning_keys
+from src.utils.training_stats import TrainingStats
+
+logger = logging.getLogger(__name__)
+
+
+def load_progress_for_update(employee_id, module_id):
+    """Find (locked) or create a progress row; returns (progress, assigned_delta).
+
+    The row is read with SELECT ... FOR UPDATE so concurrent completions of
+    the same module are serialized and only one of them sees the
+    incomplete -> complete transition that the rollups count.
+    """
+    progress = EmployeeProgress.query.filter_by(
+        employee_id=employee_id,
+        module_id=module_id
+    ).with_for_update().populate_existing().first()
+    if progress:
+        return progress, 0
+
+    progress = EmployeeProgress(
+        employee_id=employee_id,
+        module_id=module_id,
+        is_completed=False
+    )
+    db.session.add(progress)
+    return progress, 1
+
+
+def apply_progress_update(employee_id, module_id, data):
+    """Apply a progress update (position and/or completion) and commit; returns the progress row"""
+    company_id = TrainingStats.company_id_for_employee(employee_id)
+
+    progress, assigned_delta = load_progress_for_update(employee_id, module_id)
+    was_completed = bool(progress.is_completed)
+
+    # Update progress
+    if 'last_position' in data:
+        progress.last_position = int(data['last_position'] or 0)
+        progress.position_updated_at = datetime.utcnow()
+
+    if 'progress' in data:
+        if (data['progress'] or 0) >= 100:
+            progress.is_completed = True
+            progress.completed_date = progress.completed_date or datetime.utcnow()
+
+    if 'completed' in data:
+        progress.is_completed = bool(data['completed'])
+        if progress.is_completed and not progress.completed_date:
+            progress.completed_date = datetime.utcnow()
+
+    # Keep the precomputed statistics in the same transaction
+    TrainingStats.record(
+        company_id, module_id,
+        assigned=assigned_delta,
+        completed=int(bool(progress.is_completed)) - int(was_completed)
+    )
+
+    db.session.commit()
+
+    # A buffered heartbeat must not overwrite this position later
+    progress_buffer.discard(employee_id, module_id)
+    return progress
+
+
+class ProgressHeartbeatBuffer:
+    """Write-behind buffer of the latest playback position per (employee, module)"""
+
+    def __init__(self, max_entries=None):
+        self.max_entries = max_entries or int(os.getenv('PROGRESS_BUFFER_MAX', '50000'))
+        self.entries = {}  # (employee_id, module_id) -> (last_position, recorded_at)
+        self.lock = threading.Lock()
+        self.full = threading.Event()
+
+    def record(self, employee_id, module_id, last_position):
+        """Buffer a position; later heartbeats for the same key replace earlier ones"""
+        with self.lock:
+            self.entries[(employee_id, module_id)] = (last_position, datetime.utcnow())
+            if len(self.entries) >= self.max_entries:
+                self.full.set()
+
+    def discard(self, employee_id, module_id):
+        with self.lock:
+            self.entries.pop((employee_id, module_id), None)
+
+    def pending(self):
+        with self.lock:
+            return len(self.entries)
+
+    def _restore(self, batch):
+        """Put back entries from a failed flush unless a newer heartbeat arrived"""
+        with self.lock:
+            for key, entry in batch.items():
+                self.entries.setdefault(key, entry)
+
+    def flush(self):
+        """Write all buffered positions; returns the number of keys written. Needs an app context."""
+        with self.lock:
+            batch, self.entries = self.entries, {}
+            self.full.clear()
+        if not batch:
+            return 0
+
+        try:
+            progress_table = EmployeeProgress.__table__
+            # Skip rows whose position was written after the heartbeat was recorded
+            db.session.execute(
+                progress_table.update().where(
+                    progress_table.c.employee_id == bindparam('b_employee_id'),
+                    progress_table.c.module_id == bindparam('b_module_id'),
+                    db.or_(
+                        progress_table.c.position_updated_at.is_(None),
+                        progress_table.c.position_updated_at <= bindparam('b_recorded_at')
+                    )
+                ).values(last_position=bindparam('b_position'), position_updated_at=bindparam('b_recorded_at')),
+                [
+                    {
+                        'b_employee_id': employee_id,
+                        'b_module_id': module_id,
+                        'b_position': position,
+                        'b_recorded_at': recorded_at
+                    }
+                    for (employee_id, module_id), (position, recorded_at) in batch.items()
+                ]
+            )
+            self._create_missing(batch)
+            db.session.commit()
+            return len(batch)
+        except Exception:
+            db.session.rollback()
+            self._restore(batch)
+            raise
+
+    @staticmethod
+    def _create_missing(batch):
+        """Create progress rows for heartbeats on modules the employee had not started yet"""
+        existing = set(
+            db.session.query(EmployeeProgress.employee_id, EmployeeProgress.module_id).filter(
+                db.tuple_(EmployeeProgress.employee_id, EmployeeProgress.module_id).in_(list(batch))
+            ).all()
+        )
+        missing = [key for key in batch if key not in existing]
+        if not missing:
+            return
+
+        module_ids = {
+            module_id for (module_id,) in db.session.query(TrainingModule.id).filter(
+                TrainingModule.id.in_({module_id for _, module_id in missing})
+            )
+        }
+        companies = dict(
+            db.session.query(Employee.id, Employee.company_id).filter(
+                Employee.id.in_({employee_id for employee_id, _ in missing})
+            ).all()
+        )
+
+        now = datetime.utcnow()
+        rows = [
+            {
+                'employee_id': employee_id,
+                'module_id': module_id,
+                'started_date': now,
+                'last_position': batch[(employee_id, module_id)][0],
+                'position_updated_at': batch[(employee_id, module_id)][1],
+                'is_completed': False,
+                'attempts': 0,
+                'time_spent_minutes': 0
+            }
+            for employee_id, module_id in missing
+            if module_id in module_ids and employee_id in companies
+        ]
+        if not rows:
+            return
+
+        # Keys a concurrent request created first are skipped and not counted
+        keys = [(row['employee_id'], row['module_id']) for row in rows]
+        inserted = insert_ignore_returning_keys(EmployeeProgress.__table__, rows, 'employee_id', 'module_id')
+        if inserted is None:
+            inserted = set(
+                db.session.query(EmployeeProgress.employee_id, EmployeeProgress.module_id).filter(
+                    db.tuple_(EmployeeProgress.employee_id, EmployeeProgress.module_id).in_(keys),
+                    EmployeeProgress.started_date == now
+                ).all()
+            )
+
+        deltas = {}
+        for employee_id, module_id in inserted:
+            key = (companies[employee_id], module_id)
+            deltas[key] = (deltas.get(key, (0, 0))[0] + 1, 0)
+        TrainingStats.record_many(deltas)
+
+
+# Global heartbeat buffer instance (one per worker process)
+progress_buffer = ProgressHeartbeatBuffer()
+
+
+class ProgressFlusher:
+    """Background thread that flushes the heartbeat buffer every few seconds"""
+
+    def __init__(self, app, buffer=None, interval=None):
+        self.app = app
+        self.buffer = buffer or progress_buffer
+        self.interval = interval or float(os.getenv('PROGRESS_FLUSH_INTERVAL', '5'))
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        """Start the flusher on a daemon thread; buffered positions are also flushed at exit"""
+        self.thread = threading.Thread(target=self.run, name='progress-flusher', daemon=True)
+        self.thread.start()
+        atexit.register(self.flush_once)
+        return self.thread
+
+    def stop(self):
+        self.stop_event.set()
+        self.buffer.full.set()
+
+    def flush_once(self):
+        with self.app.app_context():
+            try:
+                return self.buffer.flush()
+            except Exception as e:
+                logger.error(f"Progress heartbeat flush failed: {str(e)}")
+                return 0
+            finally:
+                db.session.remove()
+
+    def run(self):
+        while not self.stop_event.is_set():
+            # Wake early when the buffer fills up
+            self.buffer.full.wait(self.interval)
+            self.flush_once()
+
+
+def start_progress_flusher(app):
+    """Start the heartbeat flusher unless disabled with PROGRESS_FLUSHER=false"""
+    if os.getenv('PROGRESS_FLUSHER', 'true').lower() != 'true':
+        return None
+    flusher = ProgressFlusher(app)
+    flusher.start()
+    app.extensions['progress_flusher'] = flusher
+    return flusher
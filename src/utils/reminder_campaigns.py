@@ -0,0 +1,177 @@
+"""
+Bulk reminder campaigns for overdue training
+
+A campaign walks every active employee with incomplete training older
+than its due window, one keyset page of employees at a time, and queues
+one reminder per employee through the outbound email queue. Messages are
+scheduled at the campaign's messages/sec rate, so the queue worker sends
+them no faster than that. Each page is committed together with the
+campaign checkpoint, so an interrupted campaign resumes where it stopped
+without sending duplicates. Only one runner holds a campaign at a time: it
+is claimed atomically and the claim is kept alive by a heartbeat written
+with every page, so a crashed run can be resumed once its lease expires.
+"""
+
+import json
+import logging
+import threading
+from datetime import datetime, timedelta
+from itertools import groupby
+from src.models.database import db, Employee, TrainingModule, EmployeeProgress, OutboundEmail, ReminderCampaign
+from src.utils.email_service import email_service
+
+logger = logging.getLogger(__name__)
+
+REMINDER_SUBJECT = "Training Reminder: Overdue Modules"
+
+# A running campaign whose heartbeat is older than this is treated as crashed
+CAMPAIGN_LEASE = timedelta(minutes=5)
+
+
+class ReminderCampaignRunner:
+    """Runs (or resumes) one reminder campaign"""
+
+    def __init__(self, app, campaign_id, page_size=500):
+        self.app = app
+        self.campaign_id = campaign_id
+        self.page_size = page_size
+
+    @staticmethod
+    def create(company_ids=None, due_days=14, rate_per_second=5.0):
+        """Create a pending campaign and return it (committed)"""
+        if rate_per_second <= 0:
+            raise ValueError('rate_per_second must be positive')
+        campaign = ReminderCampaign(
+            company_ids=json.dumps(company_ids) if company_ids else None,
+            due_days=due_days,
+            rate_per_second=rate_per_second,
+            status='pending'
+        )
+        db.session.add(campaign)
+        db.session.commit()
+        return campaign
+
+    def claim(self):
+        """Atomically take the campaign for this runner.
+
+        Succeeds for pending or failed campaigns and for running campaigns
+        whose heartbeat has gone stale; returns False if another runner holds
+        it or it has completed.
+        """
+        now = datetime.utcnow()
+        result = db.session.execute(
+            ReminderCampaign.__table__.update().where(
+                ReminderCampaign.id == self.campaign_id,
+                db.or_(
+                    ReminderCampaign.status.in_(['pending', 'failed']),
+                    db.and_(
+                        ReminderCampaign.status == 'running',
+                        db.or_(
+                            ReminderCampaign.heartbeat_at.is_(None),
+                            ReminderCampaign.heartbeat_at < now - CAMPAIGN_LEASE
+                        )
+                    )
+                )
+            ).values(status='running', heartbeat_at=now, last_error=None)
+        )
+        db.session.commit()
+        return result.rowcount == 1
+
+    def start(self):
+        """Run a claimed campaign on a daemon thread"""
+        thread = threading.Thread(target=self.run, name=f'reminder-campaign-{self.campaign_id}', daemon=True)
+        thread.start()
+        return thread
+
+    def next_page(self, campaign, due_before):
+        """Overdue rows for the next page of employees after the checkpoint"""
+        overdue = db.and_(
+            EmployeeProgress.is_completed == False,
+            EmployeeProgress.started_date <= due_before
+        )
+        employee_filter = [
+            Employee.id > campaign.checkpoint_employee_id,
+            Employee.is_active == True
+        ]
+        company_ids = campaign.get_company_ids()
+        if company_ids:
+            employee_filter.append(Employee.company_id.in_(company_ids))
+
+        page_ids = db.session.query(Employee.id).join(
+            EmployeeProgress, EmployeeProgress.employee_id == Employee.id
+        ).filter(overdue, *employee_filter).group_by(Employee.id).order_by(
+            Employee.id
+        ).limit(self.page_size).subquery()
+
+        return db.session.query(
+            Employee.id,
+            Employee.name,
+            Employee.email,
+            TrainingModule.title,
+            EmployeeProgress.started_date
+        ).join(
+            EmployeeProgress, EmployeeProgress.employee_id == Employee.id
+        ).join(
+            TrainingModule, TrainingModule.id == EmployeeProgress.module_id
+        ).filter(
+            Employee.id.in_(db.select(page_ids.c.id)), overdue
+        ).order_by(Employee.id, TrainingModule.id).all()
+
+    def run(self):
+        """Queue reminders page by page; the caller must have claimed the campaign"""
+        with self.app.app_context():
+            try:
+                campaign = db.session.get(ReminderCampaign, self.campaign_id)
+
+                # Template shell is rendered once for the whole campaign
+                render = email_service.compile_reminder_email()
+                due_window = timedelta(days=campaign.due_days)
+                due_before = datetime.utcnow() - due_window
+                interval = timedelta(seconds=1.0 / campaign.rate_per_second)
+
+                while True:
+                    rows = self.next_page(campaign, due_before)
+                    if not rows:
+                        break
+
+                    scheduled_at = max(datetime.utcnow(), campaign.last_scheduled_at or datetime.utcnow())
+                    messages = []
+                    for (employee_id, name, email), module_rows in groupby(rows, key=lambda r: r[:3]):
+                        overdue_modules = [{
+                            'title': title,
+                            'due_date': (started_date + due_window).strftime('%Y-%m-%d')
+                        } for _, _, _, title, started_date in module_rows]
+                        messages.append({
+                            'to_email': email,
+                            'subject': REMINDER_SUBJECT,
+                            'html_content': render(name, overdue_modules),
+                            'status': 'queued',
+                            'attempts': 0,
+                            'next_attempt_at': scheduled_at,
+                            'created_date': datetime.utcnow()
+                        })
+                        scheduled_at += interval
+                        campaign.checkpoint_employee_id = employee_id
+
+                    # Messages, checkpoint and heartbeat are committed together
+                    db.session.execute(OutboundEmail.__table__.insert(), messages)
+                    campaign.recipients_processed += len(messages)
+                    campaign.messages_queued += len(messages)
+                    campaign.last_scheduled_at = scheduled_at
+                    campaign.heartbeat_at = datetime.utcnow()
+                    db.session.commit()
+
+                campaign.status = 'completed'
+                campaign.finished_date = datetime.utcnow()
+                db.session.commit()
+                return
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Reminder campaign {self.campaign_id} failed: {str(e)}")
+                campaign = db.session.get(ReminderCampaign, self.campaign_id)
+                campaign.status = 'failed'
+                campaign.last_error = str(e)
+                db.session.commit()
+                return
+            finally:
+                db.session.remove()
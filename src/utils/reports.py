@@ -0,0 +1,530 @@
+"""
+Reporting utilities for Starcomm Training System
+"""
+
+import os
+import threading
+import time
+from sqlalchemy import text
+from src.models.database import db, Company, Employee, TrainingModule, EmployeeProgress, CompanyTrainingStats, ModuleCompanyStats
+
+
+def completed_count():
+    """SQL expression counting completed progress rows in a group"""
+    return db.func.coalesce(
+        db.func.sum(db.case((EmployeeProgress.is_completed == True, 1), else_=0)), 0
+    )
+
+
+def completion_rate(completed, assigned):
+    """Percentage of completed over assigned, rounded to one decimal"""
+    if not assigned:
+        return 0
+    return round((completed / assigned) * 100, 1)
+
+
+class CompanyProgressReport:
+    """Company progress report built from a fixed number of grouped aggregates"""
+
+    @staticmethod
+    def overall(company_id):
+        """Total and completed progress rows for the company, from the rollups"""
+        stats = db.session.get(CompanyTrainingStats, company_id)
+        if not stats:
+            return 0, 0
+        return stats.assigned_count, stats.completed_count
+
+    @staticmethod
+    def module_progress(company_id):
+        """Per-module assigned/completed counts, only for assigned modules"""
+        rows = db.session.query(
+            TrainingModule.title,
+            ModuleCompanyStats.assigned_count,
+            ModuleCompanyStats.completed_count
+        ).join(
+            ModuleCompanyStats, ModuleCompanyStats.module_id == TrainingModule.id
+        ).filter(
+            ModuleCompanyStats.company_id == company_id,
+            ModuleCompanyStats.assigned_count > 0
+        ).order_by(TrainingModule.id).all()
+
+        return [{
+            'title': title,
+            'assigned_count': assigned,
+            'completed_count': completed,
+            'completion_rate': completion_rate(completed, assigned)
+        } for title, assigned, completed in rows]
+
+    @staticmethod
+    def employee_progress(company_id):
+        """Per-employee assigned/completed counts and last activity"""
+        rows = db.session.query(
+            Employee.name,
+            db.func.count(EmployeeProgress.id),
+            completed_count(),
+            db.func.max(EmployeeProgress.started_date)
+        ).join(
+            EmployeeProgress, EmployeeProgress.employee_id == Employee.id
+        ).filter(
+            Employee.company_id == company_id
+        ).group_by(Employee.id, Employee.name).order_by(Employee.id).all()
+
+        return [{
+            'name': name,
+            'assigned_modules': assigned,
+            'completed_modules': completed,
+            'completion_rate': completion_rate(completed, assigned),
+            'last_activity': last_activity.isoformat() if last_activity else None
+        } for name, assigned, completed, last_activity in rows]
+
+    @staticmethod
+    def build(company_id):
+        """Build the full progress report payload (a fixed number of queries regardless of headcount)"""
+        total_progress, completed_progress = CompanyProgressReport.overall(company_id)
+        module_progress = CompanyProgressReport.module_progress(company_id)
+        employee_progress = CompanyProgressReport.employee_progress(company_id)
+
+        # Employees with every assigned module completed
+        top_performers = len([
+            e for e in employee_progress
+            if e['assigned_modules'] > 0 and e['completed_modules'] == e['assigned_modules']
+        ])
+
+        return {
+            'overall_completion_rate': completion_rate(completed_progress, total_progress),
+            # Calculate average completion time (placeholder)
+            'average_completion_time': "2.5 hours",
+            'top_performers': top_performers,
+            'module_progress': module_progress,
+            'employee_progress': employee_progress
+        }
+
+
+class EmployeeProgressListing:
+    """Company employee listing with assigned/completed counts from one grouped join"""
+
+    SORT_FIELDS = ('id', 'completion_rate')
+
+    @staticmethod
+    def rate_expression():
+        """SQL expression for an employee's completion ratio (0..1).
+
+        Computed in double precision (not NUMERIC, which PostgreSQL would use
+        for count * 1.0) so the value round-trips exactly through the float
+        in a keyset cursor and ties compare equal on the next page.
+        """
+        assigned = db.cast(db.func.count(EmployeeProgress.id), db.Float)
+        return db.func.coalesce(
+            db.cast(completed_count(), db.Float) / db.func.nullif(assigned, 0, type_=db.Float), 0.0
+        )
+
+    @staticmethod
+    def parse_cursor(cursor, sort):
+        """Parse a keyset cursor: '<id>' or '<rate>:<id>' when sorting by completion rate"""
+        if not cursor:
+            return None
+        try:
+            if sort == 'completion_rate':
+                rate, last_id = cursor.split(':', 1)
+                return float(rate), int(last_id)
+            return int(cursor)
+        except ValueError:
+            raise ValueError('Invalid cursor')
+
+    @staticmethod
+    def fetch(company_id, search='', department='', sort='id', order='asc', cursor=None, limit=None):
+        """Return (employees, next_cursor) for one page of the listing"""
+        if sort not in EmployeeProgressListing.SORT_FIELDS:
+            raise ValueError(f'Unsupported sort field: {sort}')
+        descending = order == 'desc'
+        rate = EmployeeProgressListing.rate_expression()
+
+        query = db.session.query(
+            Employee.id,
+            Employee.name,
+            Employee.email,
+            Employee.department,
+            Employee.created_date,
+            db.func.count(EmployeeProgress.id),
+            completed_count(),
+            rate
+        ).outerjoin(
+            EmployeeProgress, EmployeeProgress.employee_id == Employee.id
+        ).filter(Employee.company_id == company_id)
+
+        if search:
+            query = query.filter(
+                db.or_(
+                    Employee.name.ilike(f'%{search}%'),
+                    Employee.email.ilike(f'%{search}%')
+                )
+            )
+
+        if department:
+            query = query.filter(Employee.department == department)
+
+        query = query.group_by(
+            Employee.id, Employee.name, Employee.email, Employee.department, Employee.created_date
+        )
+
+        after = EmployeeProgressListing.parse_cursor(cursor, sort)
+        if sort == 'completion_rate':
+            if after is not None:
+                last_rate, last_id = after
+                last_rate = db.cast(last_rate, db.Float)
+                if descending:
+                    query = query.having(db.or_(
+                        rate < last_rate,
+                        db.and_(rate == last_rate, Employee.id > last_id)
+                    ))
+                else:
+                    query = query.having(db.or_(
+                        rate > last_rate,
+                        db.and_(rate == last_rate, Employee.id > last_id)
+                    ))
+            query = query.order_by(rate.desc() if descending else rate.asc(), Employee.id.asc())
+        else:
+            if after is not None:
+                query = query.filter(Employee.id < after if descending else Employee.id > after)
+            query = query.order_by(Employee.id.desc() if descending else Employee.id.asc())
+
+        if limit:
+            # Fetch one extra row to know whether another page exists
+            rows = query.limit(limit + 1).all()
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+        else:
+            rows = query.all()
+            has_more = False
+
+        employees = [{
+            'id': employee_id,
+            'name': name,
+            'email': email,
+            'department': department_name,
+            'assigned_modules': assigned,
+            'completed_modules': completed,
+            'training_progress': completion_rate(completed, assigned),
+            'created_date': created_date.isoformat() if created_date else None
+        } for employee_id, name, email, department_name, created_date, assigned, completed, _ in rows]
+
+        next_cursor = None
+        if has_more and rows:
+            last = rows[-1]
+            next_cursor = f'{last[7]!r}:{last[0]}' if sort == 'completion_rate' else str(last[0])
+
+        return employees, next_cursor
+
+
+class CompanyListing:
+    """Master admin company listing with employee headcounts from one grouped outer join"""
+
+    _trigram_available = None
+
+    @staticmethod
+    def trigram_available():
+        """Whether pg_trgm is installed (checked once per process)"""
+        if CompanyListing._trigram_available is None:
+            CompanyListing._trigram_available = bool(db.session.execute(
+                text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            ).scalar())
+        return CompanyListing._trigram_available
+
+    @staticmethod
+    def name_filter(search):
+        """Index-backed name search.
+
+        PostgreSQL with pg_trgm: substring match served by the trigram GIN index.
+        Otherwise: case-insensitive prefix match served by the lower(name) /
+        NOCASE prefix index.
+        """
+        escaped = search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        if db.engine.dialect.name == 'postgresql':
+            if CompanyListing.trigram_available():
+                return Company.name.ilike(f'%{escaped}%', escape='\\')
+            return db.func.lower(Company.name).like(f'{escaped.lower()}%', escape='\\')
+        return Company.name.like(f'{escaped}%', escape='\\')
+
+    @staticmethod
+    def fetch(search='', status='all', cursor=None, limit=None):
+        """Return (companies, next_cursor) for one page ordered by id; cursor is the last id"""
+        try:
+            after = int(cursor) if cursor else None
+        except ValueError:
+            raise ValueError('Invalid cursor')
+
+        query = db.session.query(
+            Company, db.func.count(Employee.id)
+        ).outerjoin(
+            Employee, Employee.company_id == Company.id
+        )
+
+        if search:
+            query = query.filter(CompanyListing.name_filter(search))
+
+        if status == 'active':
+            query = query.filter(Company.is_active == True)
+        elif status == 'inactive':
+            query = query.filter(Company.is_active == False)
+
+        if after is not None:
+            query = query.filter(Company.id > after)
+
+        query = query.group_by(Company.id).order_by(Company.id)
+
+        if limit:
+            # Fetch one extra row to know whether another page exists
+            rows = query.limit(limit + 1).all()
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+        else:
+            rows = query.all()
+            has_more = False
+
+        companies = []
+        for company, employee_count in rows:
+            company_dict = company.to_dict()
+            company_dict['actual_employee_count'] = employee_count
+            companies.append(company_dict)
+
+        next_cursor = str(rows[-1][0].id) if has_more and rows else None
+        return companies, next_cursor
+
+
+class TTLCache:
+    """Small thread-safe cache of computed results that expire after ttl seconds.
+
+    Concurrent misses for the same key wait for a single computation instead
+    of each running the query.
+    """
+
+    def __init__(self, ttl, max_entries=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = {}  # key -> (expires_at, value)
+        self.key_locks = {}
+        self.lock = threading.Lock()
+
+    def _prune(self):
+        """Drop expired entries once the cache grows past max_entries (call with the lock held)"""
+        if not self.max_entries or len(self.entries) <= self.max_entries:
+            return
+        now = time.monotonic()
+        for key in [key for key, (expires_at, _) in self.entries.items() if expires_at <= now]:
+            del self.entries[key]
+            self.key_locks.pop(key, None)
+        if len(self.entries) > self.max_entries:
+            self.entries.clear()
+            self.key_locks.clear()
+
+    def get_or_compute(self, key, compute):
+        if self.ttl <= 0:
+            return compute()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                return entry[1]
+            key_lock = self.key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self.lock:
+                entry = self.entries.get(key)
+                if entry and entry[0] > time.monotonic():
+                    return entry[1]
+            value = compute()
+            with self.lock:
+                self.entries[key] = (time.monotonic() + self.ttl, value)
+                self._prune()
+            return value
+
+    def invalidate(self, key=None):
+        """Drop one key, or everything when key is None"""
+        with self.lock:
+            if key is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(key, None)
+
+
+# Short-lived cache for master console aggregates
+master_report_cache = TTLCache(ttl=float(os.getenv('MASTER_REPORT_CACHE_SECONDS', '30')))
+
+
+class MasterReports:
+    """Platform-wide aggregates for the master admin console, one statement each"""
+
+    @staticmethod
+    def dashboard_counts():
+        """Company, employee and module counts in a single round trip"""
+        company_counts = db.select(
+            db.func.count(Company.id),
+            db.func.count(Company.id).filter(Company.is_active == True)
+        ).subquery()
+        employee_count = db.select(db.func.count(Employee.id)).scalar_subquery()
+        active_module_count = db.select(
+            db.func.count(TrainingModule.id).filter(TrainingModule.is_active == True)
+        ).scalar_subquery()
+
+        total_companies, active_companies, total_employees, active_modules = db.session.execute(
+            db.select(*company_counts.c, employee_count, active_module_count)
+        ).one()
+        return {
+            'total_companies': total_companies,
+            'active_companies': active_companies,
+            'total_employees': total_employees,
+            'active_modules': active_modules
+        }
+
+    @staticmethod
+    def overview():
+        """Overall and per-active-module completion from one grouped pass over the rollups"""
+        rows = db.session.query(
+            TrainingModule.title,
+            TrainingModule.is_active,
+            db.func.coalesce(db.func.sum(ModuleCompanyStats.assigned_count), 0),
+            db.func.coalesce(db.func.sum(ModuleCompanyStats.completed_count), 0)
+        ).outerjoin(
+            ModuleCompanyStats, ModuleCompanyStats.module_id == TrainingModule.id
+        ).group_by(
+            TrainingModule.id, TrainingModule.title, TrainingModule.is_active
+        ).order_by(TrainingModule.id).all()
+
+        total_progress = sum(assigned for _, _, assigned, _ in rows)
+        completed_progress = sum(completed for _, _, _, completed in rows)
+        overall_rate = (completed_progress / total_progress * 100) if total_progress > 0 else 0
+
+        return {
+            'overall_completion_rate': round(overall_rate, 2),
+            'total_progress_records': total_progress,
+            'completed_records': completed_progress,
+            'module_stats': [{
+                'module_name': title,
+                'total_attempts': assigned,
+                'completed_attempts': completed,
+                'completion_rate': round((completed / assigned * 100) if assigned > 0 else 0, 2)
+            } for title, is_active, assigned, completed in rows if is_active]
+        }
+
+
+class EmployeeDashboard:
+    """Lean employee dashboard: selected columns only, statistics in SQL, no quiz payloads"""
+
+    SECTIONS = ('employee', 'statistics', 'recent_activity', 'modules', 'progress')
+
+    @staticmethod
+    def parse_fields(fields):
+        """Parse a comma-separated fields= projection into dashboard sections"""
+        if not fields:
+            return list(EmployeeDashboard.SECTIONS)
+        requested = [field.strip() for field in fields.split(',') if field.strip()]
+        unknown = [field for field in requested if field not in EmployeeDashboard.SECTIONS]
+        if unknown:
+            raise ValueError(f"Unknown dashboard fields: {', '.join(unknown)}")
+        return requested
+
+    @staticmethod
+    def employee(employee_id):
+        row = db.session.query(
+            Employee.id, Employee.company_id, Employee.name, Employee.email, Employee.department
+        ).filter(Employee.id == employee_id).first()
+        if not row:
+            return None
+        return {
+            'id': row.id,
+            'company_id': row.company_id,
+            'name': row.name,
+            'email': row.email,
+            'department': row.department
+        }
+
+    @staticmethod
+    def statistics(employee_id):
+        completed, in_progress = db.session.query(
+            completed_count(),
+            db.func.coalesce(db.func.sum(db.case(
+                (db.and_(EmployeeProgress.is_completed == False, EmployeeProgress.last_position > 0), 1),
+                else_=0
+            )), 0)
+        ).filter(EmployeeProgress.employee_id == employee_id).one()
+        total_modules = db.session.query(db.func.count(TrainingModule.id)).scalar()
+        return {
+            'completed_modules': completed,
+            'total_modules': total_modules,
+            'in_progress_modules': in_progress,
+            'overall_progress': round((completed / total_modules) * 100) if total_modules > 0 else 0
+        }
+
+    @staticmethod
+    def recent_activity(employee_id, limit=5):
+        rows = db.session.query(
+            EmployeeProgress.module_id,
+            TrainingModule.title,
+            EmployeeProgress.started_date,
+            EmployeeProgress.completed_date,
+            EmployeeProgress.is_completed,
+            EmployeeProgress.score
+        ).join(
+            TrainingModule, TrainingModule.id == EmployeeProgress.module_id
+        ).filter(
+            EmployeeProgress.employee_id == employee_id,
+            EmployeeProgress.started_date.isnot(None)
+        ).order_by(EmployeeProgress.started_date.desc()).limit(limit).all()
+        return [{
+            'module_id': row.module_id,
+            'module_title': row.title,
+            'started_date': row.started_date.isoformat() if row.started_date else None,
+            'completed_date': row.completed_date.isoformat() if row.completed_date else None,
+            'is_completed': row.is_completed,
+            'score': row.score
+        } for row in rows]
+
+    @staticmethod
+    def modules(employee_id):
+        # Every module, like the full dashboard, so the list matches total_modules
+        rows = db.session.query(
+            TrainingModule.id,
+            TrainingModule.title,
+            TrainingModule.category,
+            TrainingModule.duration_minutes,
+            TrainingModule.difficulty_level,
+            TrainingModule.passing_score
+        ).order_by(TrainingModule.id).all()
+        return [{
+            'id': row.id,
+            'title': row.title,
+            'category': row.category,
+            'duration_minutes': row.duration_minutes,
+            'difficulty_level': row.difficulty_level,
+            'passing_score': row.passing_score
+        } for row in rows]
+
+    @staticmethod
+    def progress(employee_id):
+        rows = db.session.query(
+            EmployeeProgress.module_id,
+            EmployeeProgress.is_completed,
+            EmployeeProgress.score,
+            EmployeeProgress.last_position,
+            EmployeeProgress.completed_date
+        ).filter(EmployeeProgress.employee_id == employee_id).all()
+        return [{
+            'module_id': row.module_id,
+            'is_completed': row.is_completed,
+            'score': row.score,
+            'last_position': row.last_position,
+            'completed_date': row.completed_date.isoformat() if row.completed_date else None
+        } for row in rows]
+
+    @staticmethod
+    def build(employee_id, sections):
+        """Build only the requested sections; returns None if the employee does not exist"""
+        if not db.session.query(Employee.id).filter(Employee.id == employee_id).first():
+            return None
+        builders = {
+            'employee': EmployeeDashboard.employee,
+            'statistics': EmployeeDashboard.statistics,
+            'recent_activity': EmployeeDashboard.recent_activity,
+            'modules': EmployeeDashboard.modules,
+            'progress': EmployeeDashboard.progress
+        }
+        return {section: builders[section](employee_id) for section in sections}
@@ -3,9 +3,12 @@ Security utilities for Starcomm Training System
 """
 
 import hashlib
+import os
 import time
 import re
 import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 from functools import wraps
 from flask import request, jsonify, session
@@ -54,44 +57,108 @@ class SecurityValidator:
             return False, "Company name must be less than 100 characters"
         return True, "Valid company name"
 
-class RateLimiter:
-    """Rate limiting for API endpoints"""
+class MemoryRateLimitBackend:
+    """In-process sliding window counter: O(1) memory per key with TTL eviction"""
     
-    def __init__(self):
-        self.attempts = {}
-        self.blocked_ips = {}
+    def __init__(self, sweep_every=1000):
+        self.counters = {}  # key -> (window_index, previous_count, current_count, expires_at)
+        self.lock = threading.Lock()
+        self.sweep_every = sweep_every
+        self.calls = 0
     
-    def is_rate_limited(self, ip_address, max_attempts=5, window_minutes=15):
-        """Check if IP is rate limited"""
-        current_time = datetime.now()
+    def hit(self, key, window_seconds, now=None):
+        """Count one hit and return the estimated hits in the sliding window"""
+        now = now or time.time()
+        window_index = int(now // window_seconds)
+        with self.lock:
+            entry = self.counters.get(key)
+            if entry is None or entry[0] < window_index - 1:
+                previous_count, current_count = 0, 0
+            elif entry[0] == window_index - 1:
+                previous_count, current_count = entry[2], 0
+            else:
+                previous_count, current_count = entry[1], entry[2]
+            current_count += 1
+            self.counters[key] = (window_index, previous_count, current_count, (window_index + 2) * window_seconds)
+            
+            self.calls += 1
+            if self.calls % self.sweep_every == 0:
+                self.counters = {k: v for k, v in self.counters.items() if v[3] > now}
         
-        # Clean old attempts
-        if ip_address in self.attempts:
-            self.attempts[ip_address] = [
-                attempt for attempt in self.attempts[ip_address]
-                if current_time - attempt < timedelta(minutes=window_minutes)
-            ]
+        elapsed = (now - window_index * window_seconds) / window_seconds
+        return previous_count * (1 - elapsed) + current_count
+
+class DatabaseRateLimitBackend:
+    """Sliding window counter stored in the application database, shared by all workers and hosts"""
+    
+    def __init__(self, sweep_every=500):
+        self.sweep_every = sweep_every
+        self.calls = 0
+    
+    def hit(self, key, window_seconds, now=None):
+        """Count one hit and return the estimated hits in the sliding window"""
+        from src.models.database import db, RateLimitCounter
+        from src.utils.bulk_operations import insert_ignore_duplicates
         
-        # Check if blocked
-        if ip_address in self.blocked_ips:
-            if current_time - self.blocked_ips[ip_address] < timedelta(minutes=window_minutes):
-                return True
-            else:
-                del self.blocked_ips[ip_address]
+        now = now or time.time()
+        window_index = int(now // window_seconds)
+        table = RateLimitCounter.__table__
         
-        # Check attempts
-        attempts_count = len(self.attempts.get(ip_address, []))
-        if attempts_count >= max_attempts:
-            self.blocked_ips[ip_address] = current_time
-            return True
+        # Own transaction, independent of the request's session
+        with db.engine.begin() as connection:
+            connection.execute(insert_ignore_duplicates(table), {
+                'key': key,
+                'window_index': window_index,
+                'count': 0,
+                'expires_at': (window_index + 2) * window_seconds
+            })
+            connection.execute(
+                table.update().where(
+                    table.c.key == key, table.c.window_index == window_index
+                ).values(count=table.c.count + 1)
+            )
+            counts = dict(connection.execute(
+                table.select().with_only_columns(table.c.window_index, table.c.count).where(
+                    table.c.key == key, table.c.window_index.in_([window_index - 1, window_index])
+                )
+            ).all())
+            
+            self.calls += 1
+            if self.calls % self.sweep_every == 0:
+                connection.execute(table.delete().where(table.c.expires_at < now))
         
-        return False
+        elapsed = (now - window_index * window_seconds) / window_seconds
+        return counts.get(window_index - 1, 0) * (1 - elapsed) + counts.get(window_index, 0)
+
+def rate_limit_backend_from_env():
+    """Pick the rate limit backend from RATE_LIMIT_BACKEND (database or memory)"""
+    if os.getenv('RATE_LIMIT_BACKEND', 'database') == 'memory':
+        return MemoryRateLimitBackend()
+    return DatabaseRateLimitBackend()
+
+class RateLimiter:
+    """Rate limiting for API endpoints"""
+    
+    def __init__(self, backend=None):
+        self.backend = backend or rate_limit_backend_from_env()
+    
+    def is_rate_limited(self, ip_address, max_attempts=5, window_minutes=15, scope='default'):
+        """Count this attempt and check if IP is over the limit for the window"""
+        key = f'{scope}:{window_minutes}:{ip_address}'
+        try:
+            return self.backend.hit(key, window_minutes * 60) > max_attempts
+        except Exception as e:
+            # Fail open rather than locking everyone out when the store is unavailable
+            logger.error(f"Rate limit backend error: {str(e)}")
+            return False
     
-    def record_attempt(self, ip_address):
+    def record_attempt(self, ip_address, window_minutes=15, scope='default'):
         """Record a failed attempt"""
-        if ip_address not in self.attempts:
-            self.attempts[ip_address] = []
-        self.attempts[ip_address].append(datetime.now())
+        key = f'{scope}:{window_minutes}:{ip_address}'
+        try:
+            self.backend.hit(key, window_minutes * 60)
+        except Exception as e:
+            logger.error(f"Rate limit backend error: {str(e)}")
 
 class PasswordSecurity:
     """Password hashing and verification using hashlib"""
@@ -102,6 +169,28 @@ class PasswordSecurity:
         salt = "starcomm_training_salt_2024"  # In production, use random salt per password
         return hashlib.sha256((password + salt).encode()).hexdigest()
     
+    @staticmethod
+    def hash_passwords(passwords):
+        """Hash a batch of passwords, returning hashes in input order.
+        
+        Hashing is serial unless PASSWORD_HASH_POOL_THRESHOLD is set: with the
+        current SHA-256 scheme pool overhead outweighs the hashing itself.
+        Once a slow KDF is configured, batches at or above the threshold are
+        fanned out to a bounded process pool.
+        """
+        passwords = list(passwords)
+        if not PASSWORD_HASH_POOL_THRESHOLD or len(passwords) < PASSWORD_HASH_POOL_THRESHOLD:
+            return [PasswordSecurity.hash_password(p) for p in passwords]
+        
+        try:
+            executor = _get_hash_executor()
+            chunksize = max(1, len(passwords) // (PASSWORD_HASH_WORKERS * 4))
+            return list(executor.map(PasswordSecurity.hash_password, passwords, chunksize=chunksize))
+        except Exception as e:
+            logger.error(f"Process pool hashing failed, falling back to serial: {str(e)}")
+            _reset_hash_executor()
+            return [PasswordSecurity.hash_password(p) for p in passwords]
+    
     @staticmethod
     def verify_password(password, hashed):
         """Verify password against hash"""
@@ -115,6 +204,29 @@ class PasswordSecurity:
         alphabet = string.ascii_letters + string.digits
         return ''.join(secrets.choice(alphabet) for _ in range(length))
 
+# Opt-in process pool for batch password hashing (created lazily, one per worker process);
+# a threshold of 0 or unset keeps hashing serial
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_POOL_THRESHOLD = int(os.getenv('PASSWORD_HASH_POOL_THRESHOLD') or '0')
+_hash_executor = None
+_hash_executor_lock = threading.Lock()
+
+def _get_hash_executor():
+    """Return the shared hashing process pool, creating it on first use"""
+    global _hash_executor
+    with _hash_executor_lock:
+        if _hash_executor is None:
+            _hash_executor = ProcessPoolExecutor(max_workers=PASSWORD_HASH_WORKERS)
+        return _hash_executor
+
+def _reset_hash_executor():
+    """Drop a broken hashing pool so the next batch starts a fresh one"""
+    global _hash_executor
+    with _hash_executor_lock:
+        if _hash_executor is not None:
+            _hash_executor.shutdown(wait=False, cancel_futures=True)
+            _hash_executor = None
+
 class AuditLogger:
     """Security event logging"""
     
@@ -154,7 +266,7 @@ def rate_limit(max_attempts=5, window_minutes=15):
         @wraps(f)
         def decorated_function(*args, **kwargs):
             ip_address = request.remote_addr
-            if rate_limiter.is_rate_limited(ip_address, max_attempts, window_minutes):
+            if rate_limiter.is_rate_limited(ip_address, max_attempts, window_minutes, scope=f.__name__):
                 AuditLogger.log_security_event('RATE_LIMIT_EXCEEDED', f'Function: {f.__name__}', ip_address)
                 return jsonify({'error': 'Rate limit exceeded. Please try again later.'}), 429
             return f(*args, **kwargs)
@@ -0,0 +1,190 @@
+"""
+Static asset utilities for Starcomm Training System
+
+`flask build-assets` copies every CSS/JS file under src/static to
+src/static/dist with a content hash in its filename, writes precompressed
+.gz (and .br when the brotli package is installed) siblings, and rewrites
+index.html to reference the hashed names. Hashed files never change, so
+they are served with a one-year immutable Cache-Control; index.html is
+always revalidated. Without a build (local development) files are served
+from src/static as before.
+
+Scripts are bundled as declared in index.html: each
+`<!-- bundle:name -->` ... `<!-- endbundle -->` block of script tags is
+concatenated into one file loaded eagerly (the shared core), and each
+entry of the #lazy-bundles JSON block (one per role, loaded by the router
+on demand) is concatenated and replaced by its hashed bundle path.
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+import threading
+from flask import request, send_from_directory
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # optional: only .gz siblings are written without it
+    brotli = None
+
+DEFAULT_STATIC_FOLDER = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'static')
+FINGERPRINTED_EXTENSIONS = ('.css', '.js')
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# src/href attributes in index.html that point at local assets
+_REFERENCE_PATTERN = re.compile(r'''(\b(?:src|href)=["'])([^"':?#]+\.(?:css|js))(["'])''')
+_EAGER_BUNDLE_PATTERN = re.compile(r'([ \t]*)<!-- bundle:(\w+) -->(.*?)<!-- endbundle -->', re.S)
+_SCRIPT_SRC_PATTERN = re.compile(r'''<script\s+src=["']([^"']+)["']''')
+_LAZY_BUNDLES_PATTERN = re.compile(r'(<script id="lazy-bundles" type="application/json">)(.*?)(</script>)', re.S)
+
+
+class StaticAssets:
+    """Build-time fingerprinting and serving of the SPA's static files"""
+
+    def __init__(self, static_folder):
+        self.static_folder = static_folder
+        self.dist_folder = os.path.join(static_folder, DIST_DIR)
+        self.lock = threading.Lock()
+        self.manifest = None  # loaded once per process
+
+    @staticmethod
+    def _write(path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as output:
+            output.write(data)
+
+    def _write_compressed(self, path, data):
+        self._write(path + '.gz', gzip.compress(data, compresslevel=9, mtime=0))
+        if brotli is not None:
+            self._write(path + '.br', brotli.compress(data, quality=11))
+
+    def source_files(self):
+        """Paths (relative to the static folder, '/' separated) of the files to fingerprint"""
+        for root, dirs, files in os.walk(self.static_folder):
+            dirs[:] = sorted(d for d in dirs if os.path.join(root, d) != self.dist_folder)
+            for name in sorted(files):
+                if name.endswith(FINGERPRINTED_EXTENSIONS):
+                    yield os.path.relpath(os.path.join(root, name), self.static_folder).replace(os.sep, '/')
+
+    def build(self):
+        """Write hashed copies, compressed siblings, the manifest and index.html; returns the manifest"""
+        if os.path.isdir(self.dist_folder):
+            shutil.rmtree(self.dist_folder)
+
+        manifest = {}
+        for logical in self.source_files():
+            with open(os.path.join(self.static_folder, logical), 'rb') as source:
+                manifest[logical] = self._write_hashed(logical, source.read())
+
+        with open(os.path.join(self.static_folder, 'index.html'), 'r', encoding='utf-8') as source:
+            index = self.build_bundles(source.read(), manifest)
+        index = self.rewrite_references(index, manifest)
+        index_path = os.path.join(self.dist_folder, 'index.html')
+        self._write(index_path, index.encode('utf-8'))
+        self._write_compressed(index_path, index.encode('utf-8'))
+
+        self._write(os.path.join(self.dist_folder, MANIFEST_NAME), json.dumps(manifest, indent=2).encode('utf-8'))
+        with self.lock:
+            self.manifest = manifest
+        return manifest
+
+    def _write_hashed(self, logical, data):
+        """Write data under a content-hashed name (plus compressed siblings); returns that name"""
+        digest = hashlib.sha256(data).hexdigest()[:12]
+        stem, extension = os.path.splitext(logical)
+        hashed = f'{DIST_DIR}/{stem}.{digest}{extension}'
+        target = os.path.join(self.static_folder, hashed)
+        self._write(target, data)
+        self._write_compressed(target, data)
+        return hashed
+
+    def _write_bundle(self, name, sources, manifest):
+        """Concatenate scripts (in order) into one hashed bundle; returns its name"""
+        parts = []
+        for src in sources:
+            with open(os.path.join(self.static_folder, src.lstrip('/')), 'rb') as source:
+                parts.append(source.read().rstrip() + b'\n')
+        # Top-level consts stay globals: classic scripts share one global scope
+        hashed = self._write_hashed(f'js/bundles/{name}.js', b';\n'.join(parts))
+        manifest[f'js/bundles/{name}.js'] = hashed
+        return hashed
+
+    def build_bundles(self, html, manifest):
+        """Replace the eager bundle blocks and the lazy bundle map in index.html with built bundles"""
+        def eager(match):
+            indent, name, block = match.groups()
+            hashed = self._write_bundle(name, _SCRIPT_SRC_PATTERN.findall(block), manifest)
+            return f'{indent}<script src="{hashed}"></script>'
+
+        def lazy(match):
+            opening, config, closing = match.groups()
+            bundles = {
+                name: [self._write_bundle(name, sources, manifest)]
+                for name, sources in json.loads(config).items()
+            }
+            return opening + json.dumps(bundles) + closing
+
+        html = _EAGER_BUNDLE_PATTERN.sub(eager, html)
+        return _LAZY_BUNDLES_PATTERN.sub(lazy, html)
+
+    @staticmethod
+    def rewrite_references(html, manifest):
+        """Point src/href attributes at the hashed filenames"""
+        def replace(match):
+            prefix, path, suffix = match.groups()
+            return prefix + manifest.get(path.lstrip('/'), path) + suffix
+        return _REFERENCE_PATTERN.sub(replace, html)
+
+    def load_manifest(self):
+        """The build manifest ({} when assets have not been built)"""
+        with self.lock:
+            if self.manifest is None:
+                try:
+                    with open(os.path.join(self.dist_folder, MANIFEST_NAME), 'r', encoding='utf-8') as source:
+                        self.manifest = json.load(source)
+                except (OSError, ValueError):
+                    self.manifest = {}
+            return self.manifest
+
+    def is_fingerprinted(self, path):
+        return path.startswith(DIST_DIR + '/') and path in set(self.load_manifest().values())
+
+    def _send(self, path, cache_control):
+        """Send a file from the static folder, preferring a precompressed sibling the client accepts"""
+        accepted = request.headers.get('Accept-Encoding', '')
+        mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+        response = None
+        for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+            candidate = safe_join(self.static_folder, path + suffix)
+            if encoding in accepted and candidate and os.path.isfile(candidate):
+                response = send_from_directory(self.static_folder, path + suffix, mimetype=mimetype)
+                # The ETag comes from the compressed file, so each encoding has its own
+                response.headers['Content-Encoding'] = encoding
+                break
+        if response is None:
+            response = send_from_directory(self.static_folder, path, mimetype=mimetype)
+
+        response.headers['Cache-Control'] = cache_control
+        response.vary.add('Accept-Encoding')
+        return response
+
+    def send_asset(self, path):
+        """Serve a fingerprinted file with a long-lived immutable cache lifetime"""
+        return self._send(path, IMMUTABLE_CACHE_CONTROL)
+
+    def send_index(self):
+        """index.html (the rewritten one when assets are built); always revalidated"""
+        path = f'{DIST_DIR}/index.html' if self.load_manifest() else 'index.html'
+        return self._send(path, 'no-cache')
+
+
+# Global static asset instance
+static_assets = StaticAssets(DEFAULT_STATIC_FOLDER)
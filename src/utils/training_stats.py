@@ -0,0 +1,174 @@
+"""
+Precomputed training statistics for Starcomm Training System
+
+CompanyTrainingStats and ModuleCompanyStats hold assigned/completed
+counts per company and per (company, module). They are updated in the
+same transaction as the EmployeeProgress change that affects them, so
+dashboards read a handful of rows instead of scanning employee_progress.
+"""
+
+from collections import defaultdict
+from sqlalchemy import bindparam
+from src.models.database import db, Employee, EmployeeProgress, CompanyTrainingStats, ModuleCompanyStats
+from src.utils.bulk_operations import insert_ignore_duplicates
+
+
+def _completed_sum():
+    return db.func.coalesce(
+        db.func.sum(db.case((EmployeeProgress.is_completed == True, 1), else_=0)), 0
+    )
+
+
+class TrainingStats:
+    """Incremental maintenance and reads of the training statistics rollups"""
+
+    @staticmethod
+    def company_id_for_employee(employee_id):
+        """Look up the company an employee belongs to"""
+        return db.session.query(Employee.company_id).filter(Employee.id == employee_id).scalar()
+
+    @staticmethod
+    def record(company_id, module_id, assigned=0, completed=0):
+        """Apply a single assigned/completed delta for one company and module"""
+        TrainingStats.record_many({(company_id, module_id): (assigned, completed)})
+
+    @staticmethod
+    def record_many(deltas):
+        """Apply {(company_id, module_id): (assigned_delta, completed_delta)} to the rollups.
+
+        Does not commit; callers commit together with their progress change.
+        """
+        deltas = {key: value for key, value in deltas.items() if key[0] is not None and any(value)}
+        if not deltas:
+            return
+
+        company_deltas = defaultdict(lambda: [0, 0])
+        for (company_id, _), (assigned, completed) in deltas.items():
+            company_deltas[company_id][0] += assigned
+            company_deltas[company_id][1] += completed
+
+        # Make sure every target row exists, then increment in place
+        db.session.execute(
+            insert_ignore_duplicates(ModuleCompanyStats.__table__),
+            [{'company_id': c, 'module_id': m, 'assigned_count': 0, 'completed_count': 0} for c, m in deltas]
+        )
+        db.session.execute(
+            insert_ignore_duplicates(CompanyTrainingStats.__table__),
+            [{'company_id': c, 'assigned_count': 0, 'completed_count': 0} for c in company_deltas]
+        )
+
+        module_table = ModuleCompanyStats.__table__
+        db.session.execute(
+            module_table.update().where(
+                module_table.c.company_id == bindparam('b_company_id'),
+                module_table.c.module_id == bindparam('b_module_id')
+            ).values(
+                assigned_count=module_table.c.assigned_count + bindparam('b_assigned'),
+                completed_count=module_table.c.completed_count + bindparam('b_completed')
+            ),
+            [
+                {'b_company_id': c, 'b_module_id': m, 'b_assigned': a, 'b_completed': d}
+                for (c, m), (a, d) in deltas.items()
+            ]
+        )
+
+        company_table = CompanyTrainingStats.__table__
+        db.session.execute(
+            company_table.update().where(
+                company_table.c.company_id == bindparam('b_company_id')
+            ).values(
+                assigned_count=company_table.c.assigned_count + bindparam('b_assigned'),
+                completed_count=company_table.c.completed_count + bindparam('b_completed')
+            ),
+            [
+                {'b_company_id': c, 'b_assigned': a, 'b_completed': d}
+                for c, (a, d) in company_deltas.items()
+            ]
+        )
+
+    @staticmethod
+    def record_employee_removal(employee_id):
+        """Subtract an employee's progress rows from the rollups (call before deleting)"""
+        company_id = TrainingStats.company_id_for_employee(employee_id)
+        rows = db.session.query(
+            EmployeeProgress.module_id,
+            db.func.count(EmployeeProgress.id),
+            _completed_sum()
+        ).filter(
+            EmployeeProgress.employee_id == employee_id
+        ).group_by(EmployeeProgress.module_id).all()
+
+        TrainingStats.record_many({
+            (company_id, module_id): (-assigned, -completed) for module_id, assigned, completed in rows
+        })
+
+    @staticmethod
+    def live_module_aggregates(company_id=None):
+        """Compute {(company_id, module_id): (assigned, completed)} from employee_progress"""
+        query = db.session.query(
+            Employee.company_id,
+            EmployeeProgress.module_id,
+            db.func.count(EmployeeProgress.id),
+            _completed_sum()
+        ).join(Employee, Employee.id == EmployeeProgress.employee_id)
+        if company_id is not None:
+            query = query.filter(Employee.company_id == company_id)
+        rows = query.group_by(Employee.company_id, EmployeeProgress.module_id).all()
+        return {(c, m): (assigned, completed) for c, m, assigned, completed in rows}
+
+    @staticmethod
+    def refresh_company(company_id):
+        """Recompute one company's rollups from employee_progress. Does not commit."""
+        ModuleCompanyStats.query.filter_by(company_id=company_id).delete()
+        CompanyTrainingStats.query.filter_by(company_id=company_id).delete()
+        TrainingStats.record_many(TrainingStats.live_module_aggregates(company_id))
+
+    @staticmethod
+    def rebuild():
+        """Recompute every rollup from scratch and commit"""
+        ModuleCompanyStats.query.delete()
+        CompanyTrainingStats.query.delete()
+        TrainingStats.record_many(TrainingStats.live_module_aggregates())
+        db.session.commit()
+
+    @staticmethod
+    def verify():
+        """Compare rollups with live aggregates; return a list of mismatch descriptions"""
+        live = TrainingStats.live_module_aggregates()
+        stored = {
+            (row.company_id, row.module_id): (row.assigned_count, row.completed_count)
+            for row in ModuleCompanyStats.query.all()
+        }
+
+        mismatches = []
+        for key in sorted(set(live) | set(stored), key=str):
+            expected = live.get(key, (0, 0))
+            actual = stored.get(key, (0, 0))
+            if expected != actual:
+                mismatches.append(
+                    f"company {key[0]} module {key[1]}: expected {expected}, stored {actual}"
+                )
+
+        live_companies = defaultdict(lambda: (0, 0))
+        for (company_id, _), (assigned, completed) in live.items():
+            a, c = live_companies[company_id]
+            live_companies[company_id] = (a + assigned, c + completed)
+        stored_companies = {
+            row.company_id: (row.assigned_count, row.completed_count)
+            for row in CompanyTrainingStats.query.all()
+        }
+        for company_id in sorted(set(live_companies) | set(stored_companies)):
+            expected = live_companies.get(company_id, (0, 0))
+            actual = stored_companies.get(company_id, (0, 0))
+            if expected != actual:
+                mismatches.append(f"company {company_id}: expected {expected}, stored {actual}")
+
+        return mismatches
+
+    @staticmethod
+    def company_totals(company_id):
+        """(assigned, completed) for a company, read from one rollup row"""
+        stats = db.session.get(CompanyTrainingStats, company_id)
+        if not stats:
+            return 0, 0
+        return stats.assigned_count, stats.completed_count
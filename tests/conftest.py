@@ -0,0 +1,55 @@
+import os
+import sys
+import tempfile
+
+import pytest
+from sqlalchemy import text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# src.main binds the engine at import time, so point it at a scratch database first
+_db_dir = tempfile.mkdtemp(prefix='starcomm-tests-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+
+from src.main import app as flask_app
+from src.models.database import db, Company, Employee, TrainingModule, EmployeeProgress
+from src.models.migrations import run_migrations
+
+
+@pytest.fixture
+def app():
+    """App context over a freshly created and migrated database"""
+    with flask_app.app_context():
+        db.drop_all()
+        db.session.execute(text('DROP TABLE IF EXISTS sqlite_stat1'))
+        db.session.commit()
+        db.create_all()
+        run_migrations()
+        yield flask_app
+        db.session.remove()
+
+
+@pytest.fixture
+def make_company(app):
+    """Create a company with employees and modules; progress is given per employee
+    as (assigned, completed) counts. Returns (company, employees, modules)."""
+    def make(progress, module_count=3, name='Acme'):
+        company = Company(name=name, admin_password='x', contact_email='admin@example.com')
+        db.session.add(company)
+        db.session.flush()
+        modules = [TrainingModule(title=f'Module {i}') for i in range(module_count)]
+        employees = [
+            Employee(company_id=company.id, name=f'Employee {i}', email=f'employee{i}@example.com',
+                     password='x', department='Sales' if i % 2 else 'Support')
+            for i in range(len(progress))
+        ]
+        db.session.add_all(modules + employees)
+        db.session.flush()
+        db.session.add_all([
+            EmployeeProgress(employee_id=employee.id, module_id=module.id, is_completed=index < completed)
+            for employee, (assigned, completed) in zip(employees, progress)
+            for index, module in enumerate(modules[:assigned])
+        ])
+        db.session.commit()
+        return company, employees, modules
+    return make
@@ -0,0 +1,28 @@
+import gzip
+import json
+
+from src.models.database import db, TrainingModule
+
+
+def test_module_catalogue_etag_differs_per_encoding(app):
+    db.session.add(TrainingModule(title='Phishing Awareness'))
+    db.session.commit()
+    client = app.test_client()
+
+    identity = client.get('/api/training-modules', headers={'Accept-Encoding': 'identity'})
+    gzipped = client.get('/api/training-modules', headers={'Accept-Encoding': 'gzip'})
+
+    assert identity.headers['ETag'] != gzipped.headers['ETag']
+    assert gzipped.headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(gzipped.data)) == identity.get_json()
+
+    revalidated = client.get('/api/training-modules', headers={
+        'Accept-Encoding': 'gzip', 'If-None-Match': gzipped.headers['ETag']
+    })
+    assert revalidated.status_code == 304
+    assert revalidated.headers['ETag'] == gzipped.headers['ETag']
+
+    mismatched = client.get('/api/training-modules', headers={
+        'Accept-Encoding': 'identity', 'If-None-Match': gzipped.headers['ETag']
+    })
+    assert mismatched.status_code == 200
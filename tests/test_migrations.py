@@ -0,0 +1,84 @@
+import pytest
+from sqlalchemy import event, text
+
+from src.models.database import db
+from src.models.migrations import current_version, latest_version, run_migrations
+from src.utils.reports import CompanyProgressReport, EmployeeDashboard, EmployeeProgressListing
+
+COMPANY_DEPARTMENT_INDEX = 'ix_employees_company_department'
+PROGRESS_INDEX = 'ix_employee_progress_employee_completed_started'
+
+
+def query_plans(fn, *args):
+    """Run fn and return the EXPLAIN QUERY PLAN details of every SELECT it issued"""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', capture)
+    try:
+        fn(*args)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capture)
+
+    connection = db.session.connection()
+    return [
+        ' '.join(row[-1] for row in connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters))
+        for statement, parameters in statements
+    ]
+
+
+def assert_no_scan(plans, *tables):
+    for table in tables:
+        assert not any(f'SCAN {table} ' in f'{plan} ' for plan in plans), plans
+
+
+@pytest.fixture
+def companies(make_company):
+    created = [make_company([(3, i % 4) for i in range(10)], name=f'Company {n}')[0] for n in range(50)]
+    # Give the planner table statistics, as a live database has
+    db.session.execute(text('ANALYZE'))
+    db.session.commit()
+    return created
+
+
+def test_migrations_are_idempotent(app):
+    assert current_version() == latest_version()
+    assert run_migrations() == latest_version()
+
+
+def test_employee_listing_uses_indexes(companies):
+    plans = query_plans(EmployeeProgressListing.fetch, companies[1].id, '', 'Sales')
+
+    assert any(COMPANY_DEPARTMENT_INDEX in plan and PROGRESS_INDEX in plan for plan in plans), plans
+
+
+def test_company_report_uses_indexes(companies):
+    plans = query_plans(CompanyProgressReport.build, companies[1].id)
+
+    assert any(COMPANY_DEPARTMENT_INDEX in plan and PROGRESS_INDEX in plan for plan in plans), plans
+
+
+def test_company_dashboard_uses_indexes(app, companies):
+    company_id = companies[1].id
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['company_admin_id'] = company_id
+        session['company_id'] = company_id
+
+    plans = query_plans(lambda: client.get(f'/api/company/{company_id}/dashboard'))
+
+    assert any(COMPANY_DEPARTMENT_INDEX in plan for plan in plans), plans
+    # Recent activity only filters on employee_id, which ties with the unique (employee_id, module_id) index
+    assert_no_scan(plans, 'employees', 'employee_progress')
+
+
+def test_employee_dashboard_uses_indexes(companies):
+    employee_id = companies[1].employees[0].id
+
+    plans = query_plans(EmployeeDashboard.build, employee_id, EmployeeDashboard.SECTIONS)
+
+    assert any(PROGRESS_INDEX in plan for plan in plans), plans
+    assert_no_scan(plans, 'employee_progress')
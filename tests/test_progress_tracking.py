@@ -0,0 +1,43 @@
+from src.models.database import db, EmployeeProgress
+from src.utils.progress_tracking import ProgressHeartbeatBuffer, apply_progress_update
+from src.utils.training_stats import TrainingStats
+
+
+def position(employee, module):
+    db.session.expire_all()
+    return EmployeeProgress.query.filter_by(employee_id=employee.id, module_id=module.id).one().last_position
+
+
+def test_flush_does_not_overwrite_a_newer_direct_write(make_company):
+    _, (employee,), (module,) = make_company([(1, 0)], module_count=1)
+    # A buffer the PUT's discard() cannot reach, like a batch the flusher already swapped out
+    buffer = ProgressHeartbeatBuffer()
+    buffer.record(employee.id, module.id, 10)
+
+    apply_progress_update(employee.id, module.id, {'last_position': 50})
+    buffer.flush()
+
+    assert position(employee, module) == 50
+
+
+def test_flush_applies_heartbeats_recorded_after_a_direct_write(make_company):
+    _, (employee,), (module,) = make_company([(1, 0)], module_count=1)
+    apply_progress_update(employee.id, module.id, {'last_position': 50})
+    buffer = ProgressHeartbeatBuffer()
+    buffer.record(employee.id, module.id, 60)
+
+    buffer.flush()
+
+    assert position(employee, module) == 60
+
+
+def test_flush_creates_missing_rows_and_counts_them(make_company):
+    _, employees, modules = make_company([(0, 0)] * 3, module_count=2)
+    buffer = ProgressHeartbeatBuffer()
+    for employee in employees:
+        for module in modules:
+            buffer.record(employee.id, module.id, 42)
+
+    assert buffer.flush() == 6
+    assert EmployeeProgress.query.count() == 6
+    assert TrainingStats.verify() == []
@@ -0,0 +1,67 @@
+import pytest
+from sqlalchemy import event
+
+from src.models.database import db
+from src.utils.reports import CompanyProgressReport, EmployeeProgressListing
+
+
+def count_statements(fn, *args):
+    """Run fn and return how many SQL statements it executed"""
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', count)
+    try:
+        fn(*args)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', count)
+    return len(statements)
+
+
+def test_company_report_query_count_does_not_grow_with_headcount(make_company):
+    small, _, _ = make_company([(3, i % 4) for i in range(10)], name='Small')
+    large, _, _ = make_company([(3, i % 4) for i in range(100)], name='Large')
+    db.session.expire_all()
+
+    small_count = count_statements(CompanyProgressReport.build, small.id)
+    large_count = count_statements(CompanyProgressReport.build, large.id)
+
+    assert small_count == large_count
+    assert len(CompanyProgressReport.build(large.id)['employee_progress']) == 100
+
+
+def page_through(company_id, order, limit=2):
+    """Follow next_cursor until exhausted; fails instead of looping forever"""
+    ids, cursor = [], None
+    for _ in range(50):
+        employees, cursor = EmployeeProgressListing.fetch(
+            company_id, sort='completion_rate', order=order, cursor=cursor, limit=limit
+        )
+        ids.extend(employee['id'] for employee in employees)
+        if cursor is None:
+            return ids
+    pytest.fail('completion_rate paging did not terminate')
+
+
+@pytest.mark.parametrize('order', ['asc', 'desc'])
+def test_completion_rate_paging_handles_tied_rates(make_company, order):
+    # Five employees tied at 1/3 (not exactly representable), around a 0 and a 1
+    progress = [(3, 1)] * 5 + [(3, 0), (3, 3), (0, 0)]
+    company, _, _ = make_company(progress)
+
+    unpaged, _ = EmployeeProgressListing.fetch(company.id, sort='completion_rate', order=order)
+    ids = page_through(company.id, order)
+
+    assert len(ids) == len(set(ids)) == len(progress)
+    assert ids == [employee['id'] for employee in unpaged]
+
+
+def test_completion_rate_cursor_is_exact(make_company):
+    company, _, _ = make_company([(3, 1)] * 3)
+
+    _, cursor = EmployeeProgressListing.fetch(company.id, sort='completion_rate', limit=1)
+
+    rate, _ = EmployeeProgressListing.parse_cursor(cursor, 'completion_rate')
+    assert rate == 1 / 3